@@ -0,0 +1,43 @@
+import src.images as images
+from concurrent.futures import ThreadPoolExecutor
+import pathlib
+import typing
+import time
+import sys
+
+
+def bench_images(corpus_dir: str, workers: int = 8) -> None:
+    """
+    Benchmarks the image preparation stage (hashing, transcoding and de-duplication) on a local
+    directory of images, sequentially and using a pool of worker threads.
+    """
+    raw_images: typing.List[bytes] = [p.read_bytes() for p in sorted(pathlib.Path(corpus_dir).iterdir())
+                                      if p.is_file()]
+    if not raw_images:
+        print(f"No images found in {corpus_dir}")
+        return
+    bytes_in: int = sum(len(r) for r in raw_images)
+
+    start: float = time.perf_counter()
+    sequential: typing.List[images.PreparedImage] = [images.prepare_image(r) for r in raw_images]
+    sequential_secs: float = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pooled: typing.List[images.PreparedImage] = list(pool.map(images.prepare_image, raw_images))
+    pooled_secs: float = time.perf_counter() - start
+
+    kept: typing.List[images.PreparedImage] = images.drop_near_duplicates(pooled)
+    bytes_out: int = sum(len(p.content) for p in kept)
+    print(f"images: {len(raw_images)}, kept after de-duplication: {len(kept)}")
+    print(f"bytes: {bytes_in} in, {bytes_out} out ({bytes_out / bytes_in:.1%})")
+    print(f"sequential: {sequential_secs:.2f}s ({len(raw_images) / sequential_secs:.1f} images/s)")
+    print(f"{workers} workers: {pooled_secs:.2f}s ({len(raw_images) / pooled_secs:.1f} images/s)")
+    assert [p.dhash for p in sequential] == [p.dhash for p in pooled]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python bench_images.py <images directory> [workers]")
+        exit(1)
+    bench_images(sys.argv[1], workers=int(sys.argv[2]) if len(sys.argv) > 2 else 8)
@@ -0,0 +1,96 @@
+from src.game_info import GameInfo
+from src.candidates import CandidateTable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+import argparse
+import typing
+import json
+import time
+import sys
+import os
+import logging
+
+
+def load_dataset(path: str) -> typing.List[typing.Dict[str, typing.Any]]:
+    """
+    Loads saved raw game data dicts from IGDB's games endpoint, either as a JSON array or as JSON
+    lines. Each dict needs a first_release_date for it to be rendered.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw: str = f.read()
+        if raw.lstrip().startswith("["):
+            return json.loads(raw)
+        return [json.loads(line) for line in raw.splitlines() if line.strip()]
+    except Exception as e:
+        raise ValueError(f"Could not load the IGDB dataset {path}") from e
+
+
+def _candidates_by_day(raw_game_data_dicts: typing.List[typing.Dict[str, typing.Any]],
+                       days: typing.List[date]) -> typing.List[typing.List[typing.Dict[str, typing.Any]]]:
+    """
+    Returns the games to render on each of the days: those released on the day's month and day,
+    from 1970 to (the day's year - 3), which pass the daily crawl's filters. They're filtered and
+    ranked at once for the whole dataset by a CandidateTable, once per year in the days.
+    """
+    table: CandidateTable = CandidateTable(raw_game_data_dicts)
+    by_year: typing.Dict[int, typing.Dict[typing.Tuple[int, int], typing.List[typing.Dict[str, typing.Any]]]] = {
+        year: table.accepted_by_month_day(min_release_year=1970, max_release_year=year - 3)
+        for year in {day.year for day in days}}
+    return [by_year[day.year].get((day.month, day.day), []) for day in days]
+
+
+def _render_day(day: date, candidates: typing.List[typing.Dict[str, typing.Any]]) -> typing.List[typing.Dict[str, typing.Any]]:
+    """
+    Renders the tweets for a single day out of its candidates from _candidates_by_day(), through
+    GameInfo, without images.
+    """
+    rendered: typing.List[typing.Dict[str, typing.Any]] = []
+    for raw_dd in candidates:
+        try:
+            game_info: GameInfo = GameInfo(raw_dd, dl_images=False)
+            rendered.append({"date": day.isoformat(), "name": game_info.record.name,
+                             "year": game_info.record.year, "tweet": game_info.tweet_text(current_year=day.year)})
+        except Exception as e:
+            rendered.append({"date": day.isoformat(), "name": raw_dd.get("name", None),
+                             "year": raw_dd.get("year", None), "error": repr(e.__cause__ or e)})
+    return rendered
+
+
+def render_tweets(dataset_path: str, start: date, end: date, out_path: str,
+                  workers: typing.Optional[int] = None) -> None:
+    """
+    Renders every tweet the bot would post from start to end (inclusive), using a saved IGDB dataset
+    instead of the network, and writes them to out_path as JSON lines. Days are rendered in parallel.
+    """
+    started: float = time.perf_counter()
+    days: typing.List[date] = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    candidates = _candidates_by_day(load_dataset(dataset_path), days)
+    rendered_count: int = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(out_path, "w", encoding="utf-8") as out:
+        for rendered in pool.map(_render_day, days, candidates,
+                                 chunksize=max(1, len(days) // (4 * (workers or os.cpu_count() or 1)))):
+            for r in rendered:
+                out.write(json.dumps(r, ensure_ascii=False) + "\n")
+            rendered_count += len(rendered)
+    secs: float = time.perf_counter() - started
+    print(f"Rendered {rendered_count} tweets for {len(days)} days in {secs:.2f}s "
+          f"({len(days) / secs:.1f} days/s, {rendered_count / secs:.1f} tweets/s) to {out_path}")
+
+
+def _parse_args(argv: typing.List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Preview the tweets for a date range, using a saved IGDB games dataset.")
+    parser.add_argument("dataset", help="JSON array or JSON lines of raw IGDB game data dicts")
+    parser.add_argument("start", type=date.fromisoformat, help="first day, YYYY-MM-DD")
+    parser.add_argument("end", type=date.fromisoformat, help="last day, YYYY-MM-DD")
+    parser.add_argument("-o", "--out", default="rendered_tweets.jsonl", help="output JSON lines file")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="number of worker processes")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.CRITICAL)     # the filters log every rejected game
+    args: argparse.Namespace = _parse_args(sys.argv[1:])
+    render_tweets(dataset_path=args.dataset, start=args.start, end=args.end,
+                  out_path=args.out, workers=args.workers)
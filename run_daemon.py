@@ -0,0 +1,150 @@
+import src.conn_redis as conn_redis
+import src.conn_twitter as conn_twitter
+import src.conn_igdb as conn_igdb
+import src.verify_env_vars as v_env
+from src.scheduler import CronTrigger, JobMetrics
+from run_daily import run_daily
+from run_hourly import run_hourly
+from dotenv import load_dotenv
+from datetime import datetime, timezone
+from os import environ
+import requests
+import asyncio
+import signal
+import typing
+import json
+import logging
+import sys
+
+
+async def _run_job(func: typing.Callable[[], None], metrics: JobMetrics) -> None:
+    """
+    Runs a blocking job in a worker thread. The jobs exit early using exit(0) (e.g. when there's
+    nothing to post), which is counted rather than allowed to stop the daemon. The jobs are run with
+    raise_errors, so failures reach this function and are counted as errors, as is any other exit code.
+    """
+    logging.info(f"Started the {metrics.name} job")
+    metrics.start()
+    try:
+        await asyncio.to_thread(func)
+        metrics.finish()
+    except SystemExit as e:
+        if e.code in (None, 0):
+            metrics.finish(early_exit=True)
+        else:
+            logging.error(f"The {metrics.name} job exited with code {e.code}")
+            metrics.finish(error=True)
+    except Exception as e:
+        logging.exception(e)
+        metrics.finish(error=True)
+    logging.info(f"Completed the {metrics.name} job in {metrics.last_duration_secs:.1f} seconds")
+
+
+async def _schedule_job(func: typing.Callable[[], None], trigger: CronTrigger, metrics: JobMetrics,
+                        jobs_lock: asyncio.Lock, stop: asyncio.Event) -> None:
+    """
+    Runs the job every time the trigger fires, until asked to stop. A running job is always
+    allowed to finish, and jobs never run at the same time as each other.
+    """
+    while not stop.is_set():
+        now: datetime = datetime.now(tz=timezone.utc)
+        metrics.next_fire = trigger.next_fire(now)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=(metrics.next_fire - now).total_seconds())
+            break
+        except asyncio.TimeoutError:
+            pass
+        async with jobs_lock:
+            if stop.is_set():
+                break
+            await _run_job(func=func, metrics=metrics)
+
+
+def _make_health_handler(all_metrics: typing.List[JobMetrics]):
+    """
+    Returns a minimal HTTP handler serving /health (JSON) and /metrics (Prometheus text).
+    """
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line: str = (await reader.readline()).decode("latin-1")
+            path: str = request_line.split(" ")[1] if request_line.count(" ") >= 2 else ""
+            if path == "/health":
+                status, content_type = "200 OK", "application/json"
+                body: str = json.dumps({"status": "ok", "jobs": {m.name: m.as_dict() for m in all_metrics}})
+            elif path == "/metrics":
+                status, content_type = "200 OK", "text/plain; version=0.0.4"
+                body = "".join(m.as_prometheus() for m in all_metrics)
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+            encoded: bytes = body.encode("utf-8")
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(encoded)}\r\nConnection: close\r\n\r\n".encode("latin-1") + encoded)
+            await writer.drain()
+        except Exception as e:
+            logging.exception(e)
+        finally:
+            writer.close()
+    return handle
+
+
+async def run_daemon() -> None:
+    """
+    Runs the daily and hourly jobs on their cron-style schedules (UTC) in a single long-running
+    process. The redis client and the HTTP sessions are kept open between runs. Stops on SIGINT or
+    SIGTERM, once the currently running job (if any) is done.
+    """
+    daily_trigger: CronTrigger = CronTrigger(environ.get("DAEMON_DAILY_CRON", "0 5"))
+    hourly_trigger: CronTrigger = CronTrigger(environ.get("DAEMON_HOURLY_CRON", "30 *"))
+    session: requests.Session = requests.Session()
+    rc = conn_redis.connect(redis_url=str(environ.get("REDIS_URL")))
+    twitter: conn_twitter.Twitter = conn_twitter.Twitter(session=session)
+
+    def daily_job() -> None:
+        # a fresh IGDB token each day, over the same warm session
+        igdb_client: conn_igdb.IGDB = conn_igdb.IGDB(client_id=environ.get("IGDB_CLIENT_ID"),
+                                                     client_secret=environ.get("IGDB_CLIENT_SECRET"),
+                                                     session=session)
+        run_daily(igdb_client=igdb_client, redis_client=rc, raise_errors=True)
+
+    def hourly_job() -> None:
+        run_hourly(twitter=twitter, redis_client=rc, raise_errors=True)
+
+    daily_metrics: JobMetrics = JobMetrics("daily")
+    hourly_metrics: JobMetrics = JobMetrics("hourly")
+    stop: asyncio.Event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    server = await asyncio.start_server(_make_health_handler([daily_metrics, hourly_metrics]),
+                                        host=environ.get("DAEMON_HEALTH_HOST", "127.0.0.1"),
+                                        port=int(environ.get("DAEMON_HEALTH_PORT", 8080)))
+    jobs_lock: asyncio.Lock = asyncio.Lock()
+    logging.info(f"Daemon started: daily {daily_trigger}, hourly {hourly_trigger}")
+    try:
+        await asyncio.gather(
+            _schedule_job(func=daily_job, trigger=daily_trigger, metrics=daily_metrics,
+                          jobs_lock=jobs_lock, stop=stop),
+            _schedule_job(func=hourly_job, trigger=hourly_trigger, metrics=hourly_metrics,
+                          jobs_lock=jobs_lock, stop=stop))
+    finally:
+        server.close()
+        await server.wait_closed()
+        session.close()
+        rc.close()
+    logging.info("Daemon stopped")
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s: %(message)s",
+                        datefmt="%d.%m.%Y %H:%M:%S",
+                        handlers=[logging.StreamHandler(sys.stdout),
+                                  logging.FileHandler("run_daemon.log", mode="a")])
+    load_dotenv()
+    v_env.verify_env_vars()
+    asyncio.run(run_daemon())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,44 @@
 import src.conn_redis as conn_redis
 import src.conn_igdb as conn_igdb
 import src.verify_env_vars as v_env
-from src.game_info import GameInfo
+from src.game_info import GameInfo, MIN_TOTAL_RATING, MIN_TOTAL_RATING_COUNT, MIN_TOTAL_RATING_COUNT_UNRATED,\
+    EXCLUDED_THEME_ID
 import typing
 import sys
 import logging
 from dotenv import load_dotenv
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, time, timedelta, timezone
 from os import environ
+import calendar
 
 
-def run_daily() -> None:
+def run_daily(igdb_client: typing.Optional[conn_igdb.IGDB] = None, redis_client=None,
+              raise_errors: bool = False) -> None:
     """
     Run this using cron/eventtrigger on a daily basis. This queries the IGDB API
     for all games released on this day from 1970 to (current year - 3), checks
     if the results are valid, then stores the game data dicts in redis. The game data dicts
-    will be fetched later, one-by-one, using run_hourly().
+    will be fetched later, one-by-one, using run_hourly(). Already connected clients may be
+    passed in; otherwise new ones are created. Failures are logged and exit cleanly, unless
+    raise_errors is set, in which case they're re-raised to the caller.
     """
     todays_raw_game_data_dicts: typing.List[typing.Any] = []
     try:
-        igdb_client: conn_igdb.IGDB = conn_igdb.IGDB(client_id=environ.get("IGDB_CLIENT_ID"),
-                                                     client_secret=environ.get("IGDB_CLIENT_SECRET"),)
+        if not igdb_client:
+            igdb_client = conn_igdb.IGDB(client_id=environ.get("IGDB_CLIENT_ID"),
+                                         client_secret=environ.get("IGDB_CLIENT_SECRET"),)
         igdb_dates: typing.List[conn_igdb.IGDB_Date] = _prepare_dates_list()
         
         for d in igdb_dates:
             # logging.debug(repr(d))
             raw_game_data_dicts_in_year: typing.List[typing.Dict[str, typing.Any]] = igdb_client.get_games_endpoint(
                 raw_body=_prepare_request_body(d))
-            for raw_dd in raw_game_data_dicts_in_year:
-                try:
-                    if (GameInfo._is_remake(raw_game_info_data_dict=raw_dd)):
-                        og_name: str = raw_dd.get("name", "")
-                        if "Remake".lower() not in og_name.lower():
-                            raw_dd["name"] = og_name + " Remake"
-                    elif (not GameInfo._is_parent(raw_game_info_data_dict=raw_dd))\
-                            or (GameInfo._is_sports(raw_game_info_data_dict=raw_dd)):
-                        raise Exception(
-                            f"game {raw_dd.get('name', '')} isn't an ancestor, or it's a sports game")
-                    raw_dd["year"] = d.lower_bound["dt"].year
-                    todays_raw_game_data_dicts.append(raw_dd)
-                except Exception as e:
-                    logging.exception(e)
-                    continue
+            todays_raw_game_data_dicts.extend(
+                _filter_raw_game_data_dicts(raw_game_data_dicts=raw_game_data_dicts_in_year, d=d))
         
-        rc = conn_redis.connect(
+        rc = redis_client if redis_client else conn_redis.connect(
             redis_url=environ.get("REDIS_URL"))
-        rc.flushdb()
+        conn_redis.clear_game_data_dicts(redis_client=rc)
         conn_redis.store_raw_game_data_dicts(
             redis_client=rc, data_dicts=todays_raw_game_data_dicts)
         logging.info("Stored games {} to Redis".format(
@@ -53,17 +46,171 @@ def run_daily() -> None:
     except Exception as e:
         logging.critical(
             "Completed a daily script: exiting following exception. Details to follow\n" + str(e), exc_info=True)
+        if raise_errors:
+            raise
         exit(0)
     logging.info("Completed a daily script")
 
 
-def _prepare_dates_list(start_year: int = 1970) -> typing.List[conn_igdb.IGDB_Date]:
+def run_daily_streaming(igdb_client: typing.Optional[conn_igdb.IGDB] = None, redis_client=None,
+                        batch_size: int = 100, limit: int = 500) -> None:
     """
-    Returns IGDB game release dates from 1970 to (current year - 3).
+    Like run_daily(), but meant for large crawls: each response is parsed incrementally, each game
+    is filtered as soon as it's parsed, and accepted games are written to a redis staging hash in
+    fixed-size batches. Memory use doesn't grow with the size of the crawl. The posting queue is
+    only replaced once the whole crawl succeeds; a failed crawl leaves yesterday's queue as it was.
     """
     try:
-        dt_now: datetime = datetime.now(tz=timezone.utc)
-        years_ints: typing.List[int] = list(range(start_year, dt_now.year - 2))
+        if not igdb_client:
+            igdb_client = conn_igdb.IGDB(client_id=environ.get("IGDB_CLIENT_ID"),
+                                         client_secret=environ.get("IGDB_CLIENT_SECRET"),)
+        igdb_dates: typing.List[conn_igdb.IGDB_Date] = _prepare_dates_list()
+        rc = redis_client if redis_client else conn_redis.connect(
+            redis_url=environ.get("REDIS_URL"))
+        accepted_raw_game_data_dicts: typing.Iterator[typing.Dict[str, typing.Any]] = (
+            raw_dd for d in igdb_dates
+            for raw_dd in _iter_filtered_raw_game_data_dicts(
+                raw_game_data_dicts=igdb_client.iter_games_endpoint(raw_body=_prepare_request_body(d, limit=limit)),
+                d=d))
+        conn_redis.stage_raw_game_data_dicts_batched(
+            redis_client=rc, data_dicts=accepted_raw_game_data_dicts, batch_size=batch_size)
+        stored: int = conn_redis.swap_staged_game_data_dicts(redis_client=rc)
+        logging.info("Stored {} games to Redis".format(stored))
+    except Exception as e:
+        logging.critical(
+            "Completed a daily script: exiting following exception. Details to follow\n" + str(e), exc_info=True)
+        exit(0)
+    logging.info("Completed a daily script")
+
+
+def run_daily_lookahead(days: int = 7, igdb_client: typing.Optional[conn_igdb.IGDB] = None,
+                        redis_client=None, limit: int = 500) -> None:
+    """
+    Like run_daily(), but a single crawl fetches the games of the next few days, one query per year
+    covering all of those days. The results are stored in per-day queues in redis. When today's
+    queue is already there, which is most days, no crawl happens at all: it's only moved to the
+    posting queue.
+    """
+    try:
+        if days < 1:
+            raise ValueError(f"Can't look ahead {days} days")
+        rc = redis_client if redis_client else conn_redis.connect(
+            redis_url=environ.get("REDIS_URL"))
+        today: datetime = datetime.now(tz=timezone.utc)
+        today_iso: str = today.date().isoformat()
+        if conn_redis.is_day_queue_filled(redis_client=rc, day=today_iso):
+            logging.info(f"The games of {today_iso} were already crawled")
+        else:
+            if not igdb_client:
+                igdb_client = conn_igdb.IGDB(client_id=environ.get("IGDB_CLIENT_ID"),
+                                             client_secret=environ.get("IGDB_CLIENT_SECRET"),)
+            day_queues: typing.Dict[str, typing.List[typing.Dict[str, typing.Any]]] = {
+                (today + timedelta(days=i)).date().isoformat(): [] for i in range(days)}
+            for d in _prepare_lookahead_dates_list(days=days, on=today):
+                raw_game_data_dicts_in_years: typing.List[typing.Dict[str, typing.Any]] = igdb_client.get_games_endpoint(
+                    raw_body=_prepare_request_body(d, limit=limit))
+                for raw_dd in _filter_raw_game_data_dicts(raw_game_data_dicts=raw_game_data_dicts_in_years, d=d):
+                    if day := _lookahead_posting_day(raw_dd, today=today, days=days):
+                        day_queues[day].append(raw_dd)
+            conn_redis.store_day_queues(redis_client=rc, day_queues=day_queues,
+                                        ttl_secs=int(timedelta(days=days + 1).total_seconds()))
+            logging.info("Stored the games of {} to Redis".format(
+                {day: len(dds) for day, dds in day_queues.items()}))
+        logging.info("Stored games {} to Redis".format(
+            conn_redis.promote_day_queue(redis_client=rc, day=today_iso)))
+    except Exception as e:
+        logging.critical(
+            "Completed a daily script: exiting following exception. Details to follow\n" + str(e), exc_info=True)
+        exit(0)
+    logging.info("Completed a daily script")
+
+
+def _prepare_lookahead_dates_list(days: int, start_year: int = 1970,
+                                  on: typing.Optional[datetime] = None) -> typing.List[conn_igdb.IGDB_Date]:
+    """
+    Returns one IGDB date range per year, from 1970 to (current year - 3), each covering the same
+    month and day as today (or the given day) and the (days - 1) days after it. When the days
+    wrap into the next year, the first range starts on Jan. 1st 1970, so those days still get
+    their 1970 games.
+    """
+    try:
+        dt_now: datetime = on if on else datetime.now(tz=timezone.utc)
+        first: datetime = datetime(dt_now.year, dt_now.month, dt_now.day, tzinfo=timezone.utc)
+        last: datetime = first + timedelta(days=days - 1)
+        start: datetime = datetime(start_year, 1, 1, tzinfo=timezone.utc)
+
+        def _in_year(dt: datetime, year: int) -> datetime:
+            # Feb. 29th becomes Feb. 28th on non-leap years
+            return dt.replace(year=year, day=28) if (dt.month == 2 and dt.day == 29 and not calendar.isleap(year))\
+                else dt.replace(year=year)
+
+        return [conn_igdb.IGDB_Date(max(_in_year(first, y), start),
+                                    _in_year(last, y + last.year - first.year) + timedelta(hours=23))
+                for y in range(start_year - (last.year - first.year), dt_now.year - 2)]
+    except Exception as e:
+        raise ValueError(
+            "Could not prepare the lookahead dates list for querying the IGDB games endpoint") from e
+
+
+def _lookahead_posting_day(raw_game_info_data_dict: typing.Dict[str, typing.Any], today: datetime,
+                           days: int) -> typing.Optional[str]:
+    """
+    Returns the day (an ISO date) out of the next few days on which a game's anniversary falls, or
+    None if it doesn't fall on any of them. Like the daily crawl, a game released after 23:00 isn't
+    counted. The game's release year is fixed according to its release date.
+    """
+    released: datetime = datetime.fromtimestamp(raw_game_info_data_dict["first_release_date"], tz=timezone.utc)
+    if released.time() > time(hour=23):
+        return None
+    for i in range(days):
+        day: datetime = today + timedelta(days=i)
+        if (day.month, day.day) == (released.month, released.day) and released.year < day.year - 2:
+            raw_game_info_data_dict["year"] = released.year
+            return day.date().isoformat()
+    return None
+
+
+def _filter_raw_game_data_dicts(raw_game_data_dicts: typing.List[typing.Dict[str, typing.Any]],
+                                d: conn_igdb.IGDB_Date) -> typing.List[typing.Dict[str, typing.Any]]:
+    """
+    Returns the raw game data dicts, released on the given date, which are worth tweeting about.
+    Remakes are renamed, and the release year is added to each accepted dict.
+    """
+    return list(_iter_filtered_raw_game_data_dicts(raw_game_data_dicts=raw_game_data_dicts, d=d))
+
+
+def _iter_filtered_raw_game_data_dicts(raw_game_data_dicts: typing.Iterable[typing.Dict[str, typing.Any]],
+                                       d: conn_igdb.IGDB_Date) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+    """
+    Lazy version of _filter_raw_game_data_dicts().
+    """
+    for raw_dd in raw_game_data_dicts:
+        try:
+            if (GameInfo._is_remake(raw_game_info_data_dict=raw_dd)):
+                og_name: str = raw_dd.get("name", "")
+                if "Remake".lower() not in og_name.lower():
+                    raw_dd["name"] = og_name + " Remake"
+            elif (not GameInfo._is_parent(raw_game_info_data_dict=raw_dd))\
+                    or (GameInfo._is_sports(raw_game_info_data_dict=raw_dd)):
+                raise Exception(
+                    f"game {raw_dd.get('name', '')} isn't an ancestor, or it's a sports game")
+            raw_dd["year"] = d.lower_bound["dt"].year
+        except Exception as e:
+            logging.exception(e)
+            continue
+        yield raw_dd
+
+
+def _prepare_dates_list(start_year: int = 1970,
+                        on: typing.Optional[datetime] = None) -> typing.List[conn_igdb.IGDB_Date]:
+    """
+    Returns IGDB game release dates from 1970 to (current year - 3), on today's month and day
+    (or on the given day's). On Feb. 29th, only leap years are returned.
+    """
+    try:
+        dt_now: datetime = on if on else datetime.now(tz=timezone.utc)
+        years_ints: typing.List[int] = [y for y in range(start_year, dt_now.year - 2)
+                                        if not (dt_now.month == 2 and dt_now.day == 29) or calendar.isleap(y)]
         dates_lower_bound: typing.List[datetime] = [
             datetime(year=y, month=dt_now.month, day=dt_now.day, tzinfo=timezone.utc) for y in years_ints]
         dates_upper_bound: typing.List[datetime] = [
@@ -76,24 +223,44 @@ def _prepare_dates_list(start_year: int = 1970) -> typing.List[conn_igdb.IGDB_Da
             "Could not prepare dates list for querying the IGDB games endpoint") from e
 
 
-def _prepare_request_body(d: conn_igdb.IGDB_Date) -> str:
+def _prepare_request_body(d: conn_igdb.IGDB_Date, limit: typing.Optional[int] = None) -> str:
     """
-    Returns the raw body of the request that'll be sent to IGDB's games endpoint.
+    Returns the raw body of the request that'll be sent to IGDB's games endpoint. Without a limit,
+    IGDB's default number of results is used.
     """
     try:
         return "fields category, name, parent_game, total_rating_count, total_rating, platforms.name,"\
+            "first_release_date,"\
             "summary, cover.url, involved_companies.company.name, involved_companies.developer,"\
             "involved_companies.publisher, genres.name, websites.category, websites.url, artworks.url,"\
             "screenshots.url, themes.name;"\
             f"where (first_release_date >= {d.lower_bound['ts']})"\
             f"& (first_release_date <= {d.upper_bound['ts']})"\
-            "& (themes != (42))"\
-            "& ((total_rating >= 78 & total_rating_count >= 15) | (total_rating_count >= 100));"
+            f"& (themes != ({EXCLUDED_THEME_ID}))"\
+            f"& ((total_rating >= {MIN_TOTAL_RATING} & total_rating_count >= {MIN_TOTAL_RATING_COUNT})"\
+            f" | (total_rating_count >= {MIN_TOTAL_RATING_COUNT_UNRATED}));"\
+            + (f"limit {limit};" if limit else "")
     except Exception as e:
         raise ValueError(
             "Had a problem preparing the raw request body for the IGDB games endpoint") from e
 
 
+def _validate_event(event: typing.Optional[typing.Dict[str, typing.Any]]) -> None:
+    """
+    Checks that the handler's event asks for a single kind of crawl, with a sensible lookahead.
+    """
+    event = event or {}
+    if event.get("stream", False) and "lookahead_days" in event:
+        raise ValueError("A daily crawl can either stream or look ahead, not both")
+    if "lookahead_days" in event:
+        try:
+            lookahead_days: int = int(event["lookahead_days"])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"lookahead_days should be a number, not {event['lookahead_days']!r}") from e
+        if lookahead_days < 1:
+            raise ValueError(f"lookahead_days should be at least 1, not {lookahead_days}")
+
+
 def handler(event, context):
     if len(logging.getLogger().handlers) > 0:   # running on AWS Lambda
         logging.getLogger().setLevel(logging.INFO)
@@ -105,9 +272,15 @@ def handler(event, context):
                             handlers=[logging.StreamHandler(sys.stdout),
                                       logging.FileHandler("run_daily.log", mode="w")])
     logging.info("Started a daily script")
+    _validate_event(event)
     load_dotenv()
     v_env.verify_env_vars()
-    run_daily()
+    if (event or {}).get("stream", False):
+        run_daily_streaming()
+    elif lookahead_days := int((event or {}).get("lookahead_days", 0)):
+        run_daily_lookahead(days=lookahead_days)
+    else:
+        run_daily()
 
 
 if __name__ == "__main__":
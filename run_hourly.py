@@ -10,37 +10,113 @@ import logging
 import sys
 
 
-def run_hourly() -> None:
+# the number of images attached to each tweet
+TWEET_IMAGES: int = 3
+
+
+def run_hourly(twitter: typing.Optional[conn_twitter.Twitter] = None, redis_client=None,
+               raise_errors: bool = False) -> None:
     """
     Run this via cron/eventtrigger on an hourly/bi-hourly basis. This fetches a single game
-    data dict, makes a GameInfo object from it, then tweets it.
+    data dict, makes a GameInfo object from it, then tweets it. If the images of a game were
+    already uploaded ahead of time, that game is tweeted using the prefetched media ids.
+    Afterwards, the next game's images are uploaded ahead of its slot. Already connected clients
+    may be passed in; otherwise new ones are created.
+    The game stays in redis, in-flight, until the tweet succeeds. If this run fails, a later run
+    returns the game to the queue once its visibility timeout passes. Failures are logged and
+    exit cleanly, unless raise_errors is set, in which case they're re-raised to the caller.
+    An empty queue always exits cleanly.
     """
     try:
-        rc = conn_redis.connect(redis_url=str(environ.get("REDIS_URL")))
-        game_data_dict: typing.Optional[typing.Dict[str, typing.Any]
-                                        ] = conn_redis.getdel_single_game_data_dict(redis_client=rc)
+        rc = redis_client if redis_client else conn_redis.connect(redis_url=str(environ.get("REDIS_URL")))
+        if not twitter:
+            twitter = conn_twitter.Twitter()
+        requeued, dropped = conn_redis.reap_inflight_game_data_dicts(redis_client=rc)
+        if requeued or dropped:
+            logging.warning(f"Returned {requeued} unacknowledged games to the queue, and dropped {dropped}")
+        game_key: typing.Optional[str] = None
+        game_data_dict: typing.Optional[typing.Dict[str, typing.Any]] = None
+        media_ids: typing.List[str] = []
+        if prefetched := conn_redis.pop_prefetched_media_ids(redis_client=rc):
+            game_key, media_ids = prefetched
+            game_data_dict = conn_redis.claim_game_data_dict(redis_client=rc, key=game_key)
         if not game_data_dict:
+            media_ids = []
+            if claimed := conn_redis.claim_single_game_data_dict(redis_client=rc):
+                game_key, game_data_dict = claimed
+        if not game_key or not game_data_dict:
             logging.info("There was no game to fetch from redis. Exiting")
             exit(0)
-        game_info: GameInfo = GameInfo(game_data_dict)
+        game_info: GameInfo = GameInfo(game_data_dict, dl_images=not media_ids)
         logging.info("Pulled game {} from Redis. {} games remaining.".format(
-            game_info.data_dict["name"], rc.dbsize()))        
-        twitter: conn_twitter.Twitter = conn_twitter.Twitter()
-        media_ids: typing.List[str] = twitter.upload_images(
-            image_binaries=game_info.images)
+            game_info.record.name, conn_redis.count_game_data_dicts(redis_client=rc)))
+        if image_cache := GameInfo.image_cache():
+            logging.info("Image cache: " + str(image_cache.stats()))
+        if media_ids:
+            logging.info("Using prefetched media ids " + str(media_ids))
+        else:
+            media_ids = twitter.upload_images(
+                image_binaries=game_info.images[:TWEET_IMAGES])
         payload: typing.Dict[str, str] = twitter.make_tweet(
-            tweet_text=str(game_info), media_ids=media_ids[:3])
+            tweet_text=str(game_info), media_ids=media_ids[:TWEET_IMAGES])
         logging.info("Trying to tweet...")
         resp: typing.Dict[str, typing.Any] = twitter.tweet(payload)
         logging.info("Tweet response: " + str(resp))
+        if not resp.get("data", None):
+            raise ValueError("Twitter didn't accept the tweet")
+        conn_redis.ack_game_data_dict(redis_client=rc, key=game_key)
+        try:
+            _prefetch_next_game_media(redis_client=rc, twitter=twitter)
+        except Exception as e:
+            logging.exception(e)
     except Exception as e:
         logging.critical(
             "Completed an hourly / bi-hourly script: exiting following exception."\
             "Details to follow\n" + str(e), exc_info=True)
+        if raise_errors:
+            raise
         exit(0)
     logging.info("Completed an hourly / bi-hourly script")
 
 
+def run_prefetch(twitter: typing.Optional[conn_twitter.Twitter] = None, redis_client=None) -> None:
+    """
+    Run this via cron/eventtrigger ahead of the hourly script, if the hourly script shouldn't do the
+    prefetching itself. Uploads the next game's images to Twitter and caches their media ids.
+    """
+    try:
+        rc = redis_client if redis_client else conn_redis.connect(redis_url=str(environ.get("REDIS_URL")))
+        _prefetch_next_game_media(redis_client=rc, twitter=twitter if twitter else conn_twitter.Twitter())
+    except Exception as e:
+        logging.critical(
+            "Completed a prefetch script: exiting following exception. Details to follow\n" + str(e), exc_info=True)
+        exit(0)
+    logging.info("Completed a prefetch script")
+
+
+def _prefetch_next_game_media(redis_client, twitter: conn_twitter.Twitter) -> None:
+    """
+    Picks the next game to be tweeted, uploads its images to Twitter and stores the media ids
+    in redis, so that the next hourly run doesn't have to.
+    """
+    peeked: typing.Optional[typing.Tuple[str, typing.Dict[str, typing.Any]]
+                            ] = conn_redis.peek_single_game_data_dict(redis_client=redis_client)
+    if not peeked:
+        logging.info("There was no game to prefetch from redis")
+        return
+    game_key, game_data_dict = peeked
+    game_info: GameInfo = GameInfo(game_data_dict)
+    media_ids: typing.List[str] = twitter.upload_images(
+        image_binaries=game_info.images[:TWEET_IMAGES])
+    if not all(media_ids):
+        raise ValueError(
+            f"Could not upload all of the images of {game_info.record.name} ahead of time")
+    conn_redis.store_prefetched_media_ids(
+        redis_client=redis_client, game_key=game_key, media_ids=media_ids)
+    logging.info("Prefetched the media ids {} of game {}".format(
+        media_ids, game_info.record.name))
+
+
 def handler(event, context):
     if len(logging.getLogger().handlers) > 0:   # running on AWS Lambda
         logging.getLogger().setLevel(logging.INFO)
@@ -54,7 +130,10 @@ def handler(event, context):
     logging.info("Started an hourly/bi-hourly script")
     load_dotenv()
     v_env.verify_env_vars()
-    run_hourly()
+    if (event or {}).get("stage", None) == "prefetch":
+        run_prefetch()
+    else:
+        run_hourly()
 
 
 if __name__ == "__main__":
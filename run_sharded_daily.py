@@ -0,0 +1,189 @@
+import src.conn_redis as conn_redis
+import src.conn_igdb as conn_igdb
+import src.verify_env_vars as v_env
+from run_daily import _filter_raw_game_data_dicts, _prepare_dates_list, _prepare_request_body
+import multiprocessing
+import json
+import typing
+import sys
+import logging
+from dotenv import load_dotenv
+from datetime import datetime, timezone
+from os import environ
+
+
+def run_crawl_coordinator(num_shards: int, igdb_client: typing.Optional[conn_igdb.IGDB] = None,
+                          redis_client=None) -> None:
+    """
+    Splits the daily crawl's dates list into shards and pushes them to the redis work queue,
+    together with a single IGDB bearer token for all of the workers to share. Already connected
+    clients may be passed in; otherwise new ones are created.
+    """
+    try:
+        if not igdb_client:
+            igdb_client = conn_igdb.IGDB(client_id=environ.get("IGDB_CLIENT_ID"),
+                                         client_secret=environ.get("IGDB_CLIENT_SECRET"),)
+        igdb_dates: typing.List[conn_igdb.IGDB_Date] = _prepare_dates_list()
+        shards: typing.List[typing.List[typing.List[int]]] = _split_dates_to_shards(
+            dates=igdb_dates, num_shards=num_shards)
+        rc = redis_client if redis_client else conn_redis.connect(
+            redis_url=environ.get("REDIS_URL"))
+        conn_redis.push_crawl_shards(redis_client=rc, shards=shards,
+                                     bearer=igdb_client.auth_header.removeprefix("Bearer "))
+        logging.info("Pushed {} crawl shards to Redis".format(len(shards)))
+    except Exception as e:
+        logging.critical(
+            "Completed a crawl coordinator: exiting following exception. Details to follow\n" + str(e), exc_info=True)
+        exit(0)
+    logging.info("Completed a crawl coordinator")
+
+
+def run_crawl_worker(requests_per_sec: int, igdb_client: typing.Optional[conn_igdb.IGDB] = None,
+                     redis_client=None) -> None:
+    """
+    Claims shards from the redis work queue until it's empty. Each of the shard's dates is queried
+    while keeping to the IGDB rate budget shared by all workers, and the accepted game data dicts
+    are stored as the shard's results. Shards whose claim has expired (their worker died) are
+    returned to the work queue first.
+    """
+    try:
+        rc = redis_client if redis_client else conn_redis.connect(
+            redis_url=environ.get("REDIS_URL"))
+        bearer: typing.Optional[str] = conn_redis.get_crawl_bearer(redis_client=rc)
+        if not bearer:
+            logging.info("There's no crawl in progress. Exiting")
+            exit(0)
+        if not igdb_client:
+            igdb_client = conn_igdb.IGDB(client_id=environ.get("IGDB_CLIENT_ID"),
+                                         client_secret=environ.get("IGDB_CLIENT_SECRET"),
+                                         bearer=bearer)
+        if requeued := conn_redis.requeue_expired_crawl_shards(redis_client=rc):
+            logging.info("Requeued {} expired crawl shards".format(requeued))
+        while raw_shard := conn_redis.claim_crawl_shard(redis_client=rc):
+            shard_raw_game_data_dicts: typing.List[typing.Dict[str, typing.Any]] = []
+            for d in _shard_to_dates(raw_shard):
+                conn_redis.acquire_rate_slot(redis_client=rc, requests_per_sec=requests_per_sec)
+                raw_game_data_dicts_in_year: typing.List[typing.Dict[str, typing.Any]] = igdb_client.get_games_endpoint(
+                    raw_body=_prepare_request_body(d))
+                shard_raw_game_data_dicts.extend(
+                    _filter_raw_game_data_dicts(raw_game_data_dicts=raw_game_data_dicts_in_year, d=d))
+            if not conn_redis.complete_crawl_shard(redis_client=rc, raw_shard=raw_shard,
+                                                   data_dicts=shard_raw_game_data_dicts):
+                logging.info("A crawl shard was already completed by another worker")
+                continue
+            logging.info("Completed a crawl shard with games {}".format(
+                [g["name"] for g in shard_raw_game_data_dicts]))
+    except Exception as e:
+        logging.critical(
+            "Completed a crawl worker: exiting following exception. Details to follow\n" + str(e), exc_info=True)
+        exit(0)
+    logging.info("Completed a crawl worker")
+
+
+def run_crawl_finalizer(redis_client=None) -> None:
+    """
+    Once every shard is done, replaces the posting queue with the crawl's results. If some shards
+    were claimed but not completed by their deadline, they are put back in the work queue for
+    another worker run; shards which are still being worked on are left alone.
+    """
+    try:
+        rc = redis_client if redis_client else conn_redis.connect(
+            redis_url=environ.get("REDIS_URL"))
+        total, done = conn_redis.get_crawl_progress(redis_client=rc)
+        if not total:
+            raise ValueError("There's no crawl to finalize")
+        if done < total:
+            requeued: int = conn_redis.requeue_expired_crawl_shards(redis_client=rc)
+            raise ValueError(
+                f"Only {done} of {total} crawl shards are done; requeued {requeued} expired shards")
+        todays_raw_game_data_dicts: typing.List[typing.Dict[str, typing.Any]] = conn_redis.get_crawl_results(
+            redis_client=rc)
+        conn_redis.clear_game_data_dicts(redis_client=rc)
+        conn_redis.store_raw_game_data_dicts(
+            redis_client=rc, data_dicts=todays_raw_game_data_dicts)
+        conn_redis.clear_crawl_keys(redis_client=rc)
+        logging.info("Stored games {} to Redis".format(
+            [g["name"] for g in todays_raw_game_data_dicts]))
+    except Exception as e:
+        logging.critical(
+            "Completed a crawl finalizer: exiting following exception. Details to follow\n" + str(e), exc_info=True)
+        exit(0)
+    logging.info("Completed a crawl finalizer")
+
+
+def _split_dates_to_shards(dates: typing.List[conn_igdb.IGDB_Date],
+                           num_shards: int) -> typing.List[typing.List[typing.List[int]]]:
+    """
+    Splits the dates into (at most) the given number of shards. Each date is stored as its
+    lower and upper bound timestamps.
+    """
+    try:
+        shards: typing.List[typing.List[typing.List[int]]] = [
+            [[d.lower_bound["ts"], d.upper_bound["ts"]] for d in dates[i::num_shards]]  # type: ignore
+            for i in range(num_shards)]
+        return [s for s in shards if s]
+    except Exception as e:
+        raise ValueError("Could not split the dates list into crawl shards") from e
+
+
+def _shard_to_dates(raw_shard: str) -> typing.List[conn_igdb.IGDB_Date]:
+    """
+    Returns the IGDB dates contained in a shard, as it's stored in redis.
+    """
+    try:
+        return [conn_igdb.IGDB_Date(datetime.fromtimestamp(lower, tz=timezone.utc),
+                                    datetime.fromtimestamp(upper, tz=timezone.utc))
+                for lower, upper in json.loads(raw_shard)]
+    except Exception as e:
+        raise ValueError("Could not read the dates of a crawl shard") from e
+
+
+def run_sharded_daily_locally(num_shards: int, num_workers: int, requests_per_sec: int) -> None:
+    """
+    Runs the whole sharded crawl on this machine: the coordinator, then the given number of
+    worker processes, then the finalizer.
+    """
+    run_crawl_coordinator(num_shards=num_shards)
+    workers: typing.List[multiprocessing.Process] = [
+        multiprocessing.Process(target=run_crawl_worker, kwargs={"requests_per_sec": requests_per_sec})
+        for _ in range(num_workers)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    run_crawl_finalizer()
+
+
+def handler(event, context):
+    """
+    The event's "stage" chooses which part of the crawl to run: "coordinate", "work" or "finalize".
+    Without an event, the whole crawl runs locally using multiple processes.
+    """
+    if len(logging.getLogger().handlers) > 0:   # running on AWS Lambda
+        logging.getLogger().setLevel(logging.INFO)
+    else:   # debug local run
+        logging.basicConfig(level=logging.INFO,
+                            format="%(asctime)s %(processName)s: %(message)s",
+                            datefmt="%d.%m.%Y %H:%M:%S",
+                            handlers=[logging.StreamHandler(sys.stdout),
+                                      logging.FileHandler("run_sharded_daily.log", mode="w")])
+    logging.info("Started a sharded daily script")
+    load_dotenv()
+    v_env.verify_env_vars()
+    num_shards: int = int(environ.get("CRAWL_SHARDS", 8))
+    requests_per_sec: int = int(environ.get("IGDB_REQUESTS_PER_SEC", 4))
+    stage: typing.Optional[str] = (event or {}).get("stage", None)
+    if stage == "coordinate":
+        run_crawl_coordinator(num_shards=num_shards)
+    elif stage == "work":
+        run_crawl_worker(requests_per_sec=requests_per_sec)
+    elif stage == "finalize":
+        run_crawl_finalizer()
+    else:
+        run_sharded_daily_locally(num_shards=num_shards,
+                                  num_workers=int(environ.get("CRAWL_WORKERS", 4)),
+                                  requests_per_sec=requests_per_sec)
+
+
+if __name__ == "__main__":
+    handler(None, None)
@@ -0,0 +1,138 @@
+import typing
+import numpy as np
+from src.game_info import MIN_TOTAL_RATING, MIN_TOTAL_RATING_COUNT, MIN_TOTAL_RATING_COUNT_UNRATED,\
+    EXCLUDED_THEME_ID, REMAKE_CATEGORY
+
+# games released after this many seconds into their release day aren't counted, like in the daily crawl
+RELEASE_CUTOFF_SECS: int = 23 * 60 * 60
+SPORT_GENRE: str = "Sport"
+
+
+class CandidateTable:
+    """
+    A columnar table of raw game data dicts, for applying the daily crawl's filters to many games
+    at once: the same checks as GameInfo._is_remake(), _is_parent(), _is_sports() and
+    _is_well_rated(), as vectorized masks. Missing numbers are stored as 0 (-1 for the category).
+    """
+
+    def __init__(self, raw_game_data_dicts: typing.List[typing.Dict[str, typing.Any]]):
+        try:
+            self.raw_game_data_dicts: typing.List[typing.Dict[str, typing.Any]] = raw_game_data_dicts
+            n: int = len(raw_game_data_dicts)
+
+            def column(key: str, dtype: typing.Any, missing: typing.Any) -> np.ndarray:
+                return np.fromiter((v if (v := dd.get(key, None)) is not None else missing
+                                    for dd in raw_game_data_dicts), dtype=dtype, count=n)
+
+            self.ids: np.ndarray = column("id", np.int64, 0)
+            self.category: np.ndarray = column("category", np.int16, -1)
+            self.parent_game: np.ndarray = column("parent_game", np.int64, 0)
+            self.rating: np.ndarray = column("total_rating", np.float64, 0)
+            self.rating_count: np.ndarray = column("total_rating_count", np.int64, 0)
+            self.has_release: np.ndarray = np.fromiter((dd.get("first_release_date", None) is not None
+                                                        for dd in raw_game_data_dicts), dtype=bool, count=n)
+            self.release_ts: np.ndarray = column("first_release_date", np.int64, 0)
+            self.excluded_theme: np.ndarray = np.fromiter(
+                (any(t.get("id", None) == EXCLUDED_THEME_ID for t in dd.get("themes", None) or [])
+                 for dd in raw_game_data_dicts), dtype=bool, count=n)
+            self.names: np.ndarray = np.array([dd.get("name", "") for dd in raw_game_data_dicts], dtype=object)
+
+            # each genre name gets a bit
+            self.genre_bits: typing.Dict[str, int] = {}
+            genres: typing.List[int] = []
+            for dd in raw_game_data_dicts:
+                mask: int = 0
+                for g in dd.get("genres", None) or []:
+                    mask |= 1 << self.genre_bits.setdefault(g.get("name", ""), len(self.genre_bits))
+                genres.append(mask)
+            if len(self.genre_bits) > 64:
+                raise ValueError("Too many distinct genres for a 64-bit genre mask")
+            self.genres: np.ndarray = np.array(genres, dtype=np.uint64)
+
+            released: np.ndarray = self.release_ts.astype("datetime64[s]")
+            released_days: np.ndarray = released.astype("datetime64[D]")
+            released_months: np.ndarray = released.astype("datetime64[M]")
+            self.release_year: np.ndarray = released.astype("datetime64[Y]").astype(np.int64) + 1970
+            self.release_month: np.ndarray = released_months.astype(np.int64) % 12 + 1
+            self.release_day: np.ndarray = (released_days - released_months.astype("datetime64[D]")).astype(np.int64) + 1
+            self.release_secs: np.ndarray = (released - released_days.astype("datetime64[s]")).astype(np.int64)
+        except Exception as e:
+            raise ValueError("Could not make a candidate table out of the raw game data dicts") from e
+
+    def __len__(self) -> int:
+        return len(self.raw_game_data_dicts)
+
+    def is_remake(self) -> np.ndarray:
+        return self.category == REMAKE_CATEGORY
+
+    def is_parent(self) -> np.ndarray:
+        return ~((self.parent_game != 0) & (self.ids != 0) & (self.parent_game != self.ids))
+
+    def is_sports(self) -> np.ndarray:
+        if (bit := self.genre_bits.get(SPORT_GENRE, None)) is None:
+            return np.zeros(len(self), dtype=bool)
+        return (self.genres & np.uint64(1 << bit)) != 0
+
+    def is_well_rated(self) -> np.ndarray:
+        return ~self.excluded_theme & (((self.rating >= MIN_TOTAL_RATING) & (self.rating_count >= MIN_TOTAL_RATING_COUNT))
+                                       | (self.rating_count >= MIN_TOTAL_RATING_COUNT_UNRATED))
+
+    def accepted(self, max_release_year: typing.Optional[int] = None,
+                 min_release_year: typing.Optional[int] = None) -> np.ndarray:
+        """
+        The games the daily crawl would accept, optionally only those released within the given years.
+        """
+        mask: np.ndarray = self.has_release & (self.release_secs <= RELEASE_CUTOFF_SECS) & self.is_well_rated()\
+            & (self.is_remake() | (self.is_parent() & ~self.is_sports()))
+        if max_release_year is not None:
+            mask &= self.release_year <= max_release_year
+        if min_release_year is not None:
+            mask &= self.release_year >= min_release_year
+        return mask
+
+    def renamed(self) -> np.ndarray:
+        """
+        The games' names, with " Remake" added to remakes which don't already say so.
+        """
+        names: np.ndarray = self.names.copy()
+        rename: np.ndarray = self.is_remake() & (np.char.find(np.char.lower(names.astype(str)), "remake") < 0)
+        names[rename] = names[rename] + " Remake"
+        return names
+
+    def rank_by_month_day(self, mask: typing.Optional[np.ndarray] = None
+                          ) -> typing.Dict[typing.Tuple[int, int], np.ndarray]:
+        """
+        Groups the (masked) games by their release month and day. Each group's row indices are
+        ranked by rating count, then by rating, highest first.
+        """
+        rows: np.ndarray = np.flatnonzero(self.accepted() if mask is None else mask)
+        month_day: np.ndarray = self.release_month[rows] * 100 + self.release_day[rows]
+        rows = rows[np.lexsort((-self.rating[rows], -self.rating_count[rows], month_day))]
+        month_day = self.release_month[rows] * 100 + self.release_day[rows]
+        keys, starts = np.unique(month_day, return_index=True)
+        return {(int(k) // 100, int(k) % 100): group for k, group in zip(keys, np.split(rows, starts[1:]))}
+
+    def accepted_by_month_day(self, max_release_year: typing.Optional[int] = None,
+                              min_release_year: typing.Optional[int] = None
+                              ) -> typing.Dict[typing.Tuple[int, int], typing.List[typing.Dict[str, typing.Any]]]:
+        """
+        The accepted games' raw dicts, grouped and ranked by rank_by_month_day(). Like the daily
+        crawl's, each dict is a copy with the release year added and remakes renamed.
+        """
+        names: np.ndarray = self.renamed()
+        is_remake: np.ndarray = self.is_remake()
+        grouped: typing.Dict[typing.Tuple[int, int], typing.List[typing.Dict[str, typing.Any]]] = {}
+        mask: np.ndarray = self.accepted(max_release_year=max_release_year, min_release_year=min_release_year)
+        for md, rows in self.rank_by_month_day(mask).items():
+            grouped[md] = []
+            for i in rows:
+                dd: typing.Dict[str, typing.Any] = dict(self.raw_game_data_dicts[i])
+                if is_remake[i]:
+                    dd["name"] = names[i]
+                dd["year"] = int(self.release_year[i])
+                grouped[md].append(dd)
+        return grouped
+
+
+if __name__ == "__main__":
+    pass
@@ -1,6 +1,7 @@
 import requests
 import typing
 import base64
+import codecs
 import json
 import logging
 from pprint import pformat
@@ -32,9 +33,12 @@ class IGDB:
     API_URL: str = "https://api.igdb.com/v4/"
     TOKEN_URL: str = "https://id.twitch.tv/oauth2/token"
 
-    def __init__(self, client_id: str, client_secret: str, bearer: typing.Optional[str] = ""):
+    def __init__(self, client_id: str, client_secret: str, bearer: typing.Optional[str] = "",
+                 session: typing.Optional[requests.Session] = None):
         self.client_id: str = client_id
         self.client_secret: str = client_secret
+        # a long-lived session keeps connections to IGDB open between requests
+        self.http: typing.Any = session if session else requests
         try:
             bearer_token: str = bearer if bearer else self.get_token()
         except Exception as e:
@@ -42,7 +46,7 @@ class IGDB:
         self.auth_header: str = "Bearer " + bearer_token
 
     def get_token(self) -> str:
-        r: requests.Response = requests.post(url=IGDB.TOKEN_URL,
+        r: requests.Response = self.http.post(url=IGDB.TOKEN_URL,
                                              params={"client_id": self.client_id,
                                                      "client_secret": self.client_secret,
                                                      "grant_type": "client_credentials"})
@@ -56,7 +60,7 @@ class IGDB:
         """ 
         Query the 'games' endpoint from the IGDB API using the given request body.
         """
-        r: typing.List[typing.Dict[str, typing.Any]] = requests.post(url=IGDB.API_URL + "games",
+        r: typing.List[typing.Dict[str, typing.Any]] = self.http.post(url=IGDB.API_URL + "games",
                                                                      headers={"Client-ID": self.client_id,
                                                                               "Authorization": self.auth_header},
                                                                      data=raw_body).json()
@@ -68,6 +72,61 @@ class IGDB:
             return r
         return r
 
+    def iter_games_endpoint(self, raw_body: str = "",
+                            chunk_size: int = 64 * 1024) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+        """
+        Query the 'games' endpoint from the IGDB API using the given request body, and yield
+        the games one at a time as the response is read, rather than parsing it as a whole.
+        """
+        with self.http.post(url=IGDB.API_URL + "games",
+                            headers={"Client-ID": self.client_id,
+                                     "Authorization": self.auth_header},
+                            data=raw_body, stream=True) as r:
+            utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+            chunks: typing.Iterator[str] = (utf8_decoder.decode(c)
+                                            for c in r.iter_content(chunk_size=chunk_size))
+            for i, game in enumerate(_iter_json_array(chunks)):
+                if i == 0 and game.get("status", None) == 500:
+                    raise ValueError(
+                        "IGDB Internal Server Error; best to try again in a while.")
+                yield game
+
+
+def _iter_json_array(chunks: typing.Iterable[str]) -> typing.Iterator[typing.Any]:
+    """
+    Incrementally parses a JSON array, given as consecutive pieces of text, and yields its
+    items as soon as each one is complete.
+    """
+    decoder: json.JSONDecoder = json.JSONDecoder()
+    buf: str = ""
+    started: bool = False
+    for chunk in chunks:
+        buf += chunk
+        pos: int = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buf):
+                break
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break   # the item isn't complete yet
+            if end == len(buf) and not isinstance(item, (dict, list)):
+                break   # a number might continue in the next chunk
+            yield item
+            pos = end
+        buf = buf[pos:]
+    raise ValueError("The JSON array ended unexpectedly")
+
 
 if __name__ == "__main__":
     pass
@@ -1,6 +1,120 @@
 import redis
 import typing
 import json
+import time
+import random
+
+# keys used by the sharded daily crawl. These are removed once the crawl is finalized.
+# Claimed shards are kept with their deadline; a shard which isn't completed by its deadline
+# is returned to the work queue. Done shards are kept as a set, so a shard completed twice
+# is only counted (and its results stored) once.
+CRAWL_SHARDS_KEY: str = "crawl:shards"
+CRAWL_CLAIMED_KEY: str = "crawl:shards:claimed"
+CRAWL_TOTAL_KEY: str = "crawl:shards:total"
+CRAWL_DONE_KEY: str = "crawl:shards:done"
+CRAWL_RESULTS_KEY: str = "crawl:results"
+CRAWL_BEARER_KEY: str = "crawl:bearer"
+CRAWL_RATE_KEY_PREFIX: str = "crawl:rate:"
+CRAWL_KEYS_TTL_SECS: int = 6 * 60 * 60
+CRAWL_CLAIM_TIMEOUT_SECS: int = 15 * 60
+
+# KEYS: work queue, claimed shards. ARGV: deadline, keys ttl
+_CLAIM_SHARD_SCRIPT: str = """
+local s = redis.call('LPOP', KEYS[1])
+if not s then return false end
+redis.call('ZADD', KEYS[2], ARGV[1], s)
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return s
+"""
+
+# KEYS: done shards, claimed shards, work queue, results. ARGV: shard, keys ttl, results...
+_COMPLETE_SHARD_SCRIPT: str = """
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('LREM', KEYS[3], 0, ARGV[1])
+if redis.call('SADD', KEYS[1], ARGV[1]) == 0 then return 0 end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+for i = 3, #ARGV do
+    redis.call('RPUSH', KEYS[4], ARGV[i])
+end
+if #ARGV > 2 then redis.call('EXPIRE', KEYS[4], ARGV[2]) end
+return 1
+"""
+
+# KEYS: claimed shards, done shards, work queue. ARGV: now
+_REQUEUE_EXPIRED_SHARDS_SCRIPT: str = """
+local requeued = 0
+for _, s in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])) do
+    redis.call('ZREM', KEYS[1], s)
+    if redis.call('SISMEMBER', KEYS[2], s) == 0 then
+        redis.call('RPUSH', KEYS[3], s)
+        requeued = requeued + 1
+    end
+end
+return requeued
+"""
+
+# the next game's pre-uploaded twitter media ids. Twitter keeps them valid for 24 hours.
+PREFETCHED_MEDIA_KEY: str = "media:next"
+PREFETCHED_MEDIA_TTL_SECS: int = 12 * 60 * 60
+
+# games which were claimed for posting, but not yet acknowledged. If a game isn't acknowledged
+# by its deadline, it's returned to the queue, unless it was already claimed too many times.
+INFLIGHT_GAMES_KEY: str = "inflight:games"
+INFLIGHT_DEADLINES_KEY: str = "inflight:deadlines"
+INFLIGHT_ATTEMPTS_KEY: str = "inflight:attempts"
+INFLIGHT_VISIBILITY_TIMEOUT_SECS: int = 15 * 60
+MAX_DELIVERY_ATTEMPTS: int = 3
+
+# these scripts move games between their own keys and the in-flight keys, which can't be
+# guaranteed to share a hash slot, so they assume a single redis node rather than a cluster.
+# KEYS: game key, in-flight games, in-flight deadlines, attempts. ARGV: deadline
+_CLAIM_GAME_SCRIPT: str = """
+local v = redis.call('GET', KEYS[1])
+if not v then return false end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[2], KEYS[1], v)
+redis.call('ZADD', KEYS[3], ARGV[1], KEYS[1])
+redis.call('HINCRBY', KEYS[4], KEYS[1], 1)
+return v
+"""
+
+# KEYS: in-flight games, in-flight deadlines, attempts, then the keys of the games to reap.
+# ARGV: now, max delivery attempts. Games which were acknowledged or claimed again since they
+# were listed are skipped.
+_REAP_INFLIGHT_SCRIPT: str = """
+local requeued, dropped = 0, 0
+for i = 4, #KEYS do
+    local k = KEYS[i]
+    local deadline = redis.call('ZSCORE', KEYS[2], k)
+    if deadline and tonumber(deadline) <= tonumber(ARGV[1]) then
+        local v = redis.call('HGET', KEYS[1], k)
+        if v and tonumber(redis.call('HGET', KEYS[3], k) or '0') < tonumber(ARGV[2]) then
+            redis.call('SET', k, v, 'NX')
+            requeued = requeued + 1
+        else
+            if v then dropped = dropped + 1 end
+            redis.call('HDEL', KEYS[3], k)
+        end
+        redis.call('HDEL', KEYS[1], k)
+        redis.call('ZREM', KEYS[2], k)
+    end
+end
+return {requeued, dropped}
+"""
+
+# the streaming crawl's accepted games, as a hash of game name -> data dict. They're moved to
+# the posting queue only once the whole crawl succeeds.
+STAGING_GAMES_KEY: str = "staging:games"
+STAGING_GAMES_TTL_SECS: int = 6 * 60 * 60
+
+# the lookahead crawl's per-day queues: a hash of game name -> data dict for each upcoming day,
+# and the set of days which were already crawled
+DAY_QUEUE_KEY_PREFIX: str = "day:"
+FILLED_DAYS_KEY: str = "day:filled"
+
+# keys with these prefixes aren't game data dicts
+RESERVED_KEY_PREFIXES: typing.Tuple[str, ...] = ("crawl:", "media:", "inflight:", "day:", "staging:")
+RANDOM_GAME_KEY_ATTEMPTS: int = 16
 
 
 def connect(redis_url: str) -> redis.Redis:
@@ -26,12 +140,157 @@ def store_raw_game_data_dicts(redis_client: redis.Redis, data_dicts: typing.List
         raise Exception("Failed to store game info dicts in redis") from e
 
 
+def stage_raw_game_data_dicts_batched(redis_client: redis.Redis,
+                                      data_dicts: typing.Iterable[typing.Dict[str, typing.Any]],
+                                      batch_size: int = 100) -> int:
+    """
+    Replace the staged games with the given data dicts, sending a pipeline every batch_size dicts.
+    The posting queue isn't touched until swap_staged_game_data_dicts() is called.
+    Returns the number of data dicts staged.
+    """
+    try:
+        staged: int = 0
+        pl = redis_client.pipeline()
+        pl.delete(STAGING_GAMES_KEY)
+        for dd in data_dicts:
+            pl.hset(name=STAGING_GAMES_KEY, key=dd["name"], value=json.dumps(dd))
+            staged += 1
+            if staged % batch_size == 0:
+                pl.expire(name=STAGING_GAMES_KEY, time=STAGING_GAMES_TTL_SECS)
+                pl.execute()
+        pl.expire(name=STAGING_GAMES_KEY, time=STAGING_GAMES_TTL_SECS)
+        pl.execute()
+        return staged
+    except Exception as e:
+        raise Exception("Failed to stage game info dicts in redis") from e
+
+
+def swap_staged_game_data_dicts(redis_client: redis.Redis, batch_size: int = 500) -> int:
+    """
+    Replace the posting queue (see clear_game_data_dicts()) with the staged games, batch_size at
+    a time. Like promote_day_queue(), yesterday's in-flight games aren't returned to today's
+    queue. Returns the number of games moved.
+    """
+    try:
+        clear_game_data_dicts(redis_client=redis_client)
+        moved: int = 0
+        pl = redis_client.pipeline()
+        for name, val in redis_client.hscan_iter(name=STAGING_GAMES_KEY, count=batch_size):
+            pl.set(name=name, value=val)
+            moved += 1
+            if moved % batch_size == 0:
+                pl.execute()
+        pl.delete(STAGING_GAMES_KEY)
+        pl.execute()
+        return moved
+    except Exception as e:
+        raise ConnectionError("Could not move the staged game info dicts in redis") from e
+
+
+def clear_game_data_dicts(redis_client: redis.Redis) -> int:
+    """
+    Delete the posting queue: every game data dict, the in-flight games and the prefetched media
+    ids. Unlike flushdb, the bot's other keys are kept. Returns the number of games deleted.
+    """
+    try:
+        pl = redis_client.pipeline()
+        deleted: int = 0
+        for key in redis_client.scan_iter(count=500):
+            if not key.startswith(RESERVED_KEY_PREFIXES):
+                pl.delete(key)
+                deleted += 1
+        pl.delete(INFLIGHT_GAMES_KEY, INFLIGHT_DEADLINES_KEY, INFLIGHT_ATTEMPTS_KEY, PREFETCHED_MEDIA_KEY)
+        pl.execute()
+        return deleted
+    except Exception as e:
+        raise ConnectionError("Could not clear the game info dicts from redis") from e
+
+
+def store_day_queues(redis_client: redis.Redis,
+                     day_queues: typing.Dict[str, typing.List[typing.Dict[str, typing.Any]]],
+                     ttl_secs: int) -> None:
+    """
+    Store the given games for each upcoming day (an ISO date), and mark the days as filled,
+    even the ones without any games.
+    """
+    try:
+        pl = redis_client.pipeline(transaction=True)
+        for day, data_dicts in day_queues.items():
+            key: str = DAY_QUEUE_KEY_PREFIX + day
+            pl.delete(key)
+            if data_dicts:
+                pl.hset(name=key, mapping={dd["name"]: json.dumps(dd) for dd in data_dicts})
+                pl.expire(name=key, time=ttl_secs)
+        if day_queues:
+            pl.sadd(FILLED_DAYS_KEY, *day_queues.keys())
+            pl.expire(name=FILLED_DAYS_KEY, time=ttl_secs)
+        pl.execute()
+    except Exception as e:
+        raise ConnectionError("Could not store the day queues in redis") from e
+
+
+def is_day_queue_filled(redis_client: redis.Redis, day: str) -> bool:
+    """
+    Checks if the games for the given day (an ISO date) were already crawled.
+    """
+    try:
+        return bool(redis_client.sismember(FILLED_DAYS_KEY, day))
+    except Exception as e:
+        raise ConnectionError(f"Could not check the day queue of {day} in redis") from e
+
+
+def promote_day_queue(redis_client: redis.Redis, day: str) -> typing.List[str]:
+    """
+    Replace the posting queue with the given day's games. Returns the names of the games.
+    """
+    try:
+        key: str = DAY_QUEUE_KEY_PREFIX + day
+        day_queue: typing.Dict[str, str] = redis_client.hgetall(name=key)
+        clear_game_data_dicts(redis_client=redis_client)
+        pl = redis_client.pipeline(transaction=True)
+        for name, val in day_queue.items():
+            pl.set(name=name, value=val)
+        pl.delete(key)
+        pl.srem(FILLED_DAYS_KEY, day)
+        pl.execute()
+        return list(day_queue.keys())
+    except Exception as e:
+        raise ConnectionError(f"Could not promote the day queue of {day} in redis") from e
+
+
+def count_game_data_dicts(redis_client: redis.Redis) -> int:
+    """
+    Count the game data dicts waiting in the posting queue, skipping the bot's own bookkeeping keys.
+    """
+    try:
+        return sum(1 for key in redis_client.scan_iter(count=500) if not key.startswith(RESERVED_KEY_PREFIXES))
+    except Exception as e:
+        raise ConnectionError("Could not count the game info dicts in redis") from e
+
+
+def get_random_game_key(redis_client: redis.Redis) -> typing.Optional[str]:
+    """
+    Get the key of a random game data dict, skipping the bot's own bookkeeping keys. Random keys
+    are sampled first; if every sample is a bookkeeping key (the queue is small), a random game is
+    picked out of a scan instead, so None means the queue really is empty.
+    """
+    for _ in range(RANDOM_GAME_KEY_ATTEMPTS):
+        key = redis_client.randomkey()
+        if not key:
+            return None
+        if not key.startswith(RESERVED_KEY_PREFIXES):
+            return key
+    game_keys: typing.List[str] = [k for k in redis_client.scan_iter(count=500)
+                                   if not k.startswith(RESERVED_KEY_PREFIXES)]
+    return random.choice(game_keys) if game_keys else None
+
+
 def getdel_single_game_data_dict(redis_client: redis.Redis) -> typing.Optional[typing.Dict[str, typing.Any]]:
     """
     Get a random game data dict from redis, then delete the key.
     """
     try:
-        key = redis_client.randomkey()
+        key = get_random_game_key(redis_client=redis_client)
         if key:
             return json.loads(str(redis_client.getdel(name=key)))
         return None
@@ -39,5 +298,241 @@ def getdel_single_game_data_dict(redis_client: redis.Redis) -> typing.Optional[t
         raise ConnectionError("Could not getdel a single game info dict from redis") from e
 
 
+def claim_game_data_dict(redis_client: redis.Redis, key: str,
+                         visibility_timeout_secs: int = INFLIGHT_VISIBILITY_TIMEOUT_SECS
+                         ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+    """
+    Atomically move the game data dict under the given key to the in-flight games, and return it.
+    Unless it's acknowledged within the visibility timeout, reap_inflight_game_data_dicts() will
+    return it to the queue.
+    """
+    try:
+        val = redis_client.eval(_CLAIM_GAME_SCRIPT, 4, key, INFLIGHT_GAMES_KEY, INFLIGHT_DEADLINES_KEY,
+                                INFLIGHT_ATTEMPTS_KEY, time.time() + visibility_timeout_secs)
+        if val:
+            return json.loads(val)
+        return None
+    except Exception as e:
+        raise ConnectionError(f"Could not claim the game info dict {key} from redis") from e
+
+
+def claim_single_game_data_dict(redis_client: redis.Redis,
+                                visibility_timeout_secs: int = INFLIGHT_VISIBILITY_TIMEOUT_SECS
+                                ) -> typing.Optional[typing.Tuple[str, typing.Dict[str, typing.Any]]]:
+    """
+    Claim a random game data dict (see claim_game_data_dict()), and return it alongside its key.
+    """
+    try:
+        key = get_random_game_key(redis_client=redis_client)
+        if key and (dd := claim_game_data_dict(redis_client=redis_client, key=key,
+                                               visibility_timeout_secs=visibility_timeout_secs)):
+            return key, dd
+        return None
+    except Exception as e:
+        raise ConnectionError("Could not claim a single game info dict from redis") from e
+
+
+def ack_game_data_dict(redis_client: redis.Redis, key: str) -> None:
+    """
+    Acknowledge that the claimed game under the given key was posted, and forget it.
+    """
+    try:
+        pl = redis_client.pipeline(transaction=True)
+        pl.hdel(INFLIGHT_GAMES_KEY, key)
+        pl.zrem(INFLIGHT_DEADLINES_KEY, key)
+        pl.hdel(INFLIGHT_ATTEMPTS_KEY, key)
+        pl.execute()
+    except Exception as e:
+        raise ConnectionError(f"Could not acknowledge the game info dict {key} in redis") from e
+
+
+def reap_inflight_game_data_dicts(redis_client: redis.Redis,
+                                  max_attempts: int = MAX_DELIVERY_ATTEMPTS) -> typing.Tuple[int, int]:
+    """
+    Return the in-flight games whose deadline has passed to the queue. Games which were already
+    claimed max_attempts times are dropped instead. Returns the (requeued, dropped) counts.
+    """
+    try:
+        now: float = time.time()
+        expired: typing.List[str] = redis_client.zrangebyscore(INFLIGHT_DEADLINES_KEY, "-inf", now)
+        if not expired:
+            return 0, 0
+        requeued, dropped = redis_client.eval(_REAP_INFLIGHT_SCRIPT, 3 + len(expired), INFLIGHT_GAMES_KEY,
+                                              INFLIGHT_DEADLINES_KEY, INFLIGHT_ATTEMPTS_KEY, *expired,
+                                              now, max_attempts)
+        return int(requeued), int(dropped)
+    except Exception as e:
+        raise ConnectionError("Could not reap the in-flight game info dicts in redis") from e
+
+
+def peek_single_game_data_dict(redis_client: redis.Redis) -> typing.Optional[typing.Tuple[str, typing.Dict[str, typing.Any]]]:
+    """
+    Get a random game data dict from redis, alongside its key, without deleting it.
+    """
+    try:
+        key = get_random_game_key(redis_client=redis_client)
+        if key and (val := redis_client.get(name=key)):
+            return key, json.loads(val)
+        return None
+    except Exception as e:
+        raise ConnectionError("Could not peek at a single game info dict in redis") from e
+
+
+def store_prefetched_media_ids(redis_client: redis.Redis, game_key: str, media_ids: typing.List[str]) -> None:
+    """
+    Store the twitter media ids uploaded ahead of time for the game under the given key.
+    """
+    try:
+        pl = redis_client.pipeline(transaction=True)
+        pl.delete(PREFETCHED_MEDIA_KEY)
+        pl.hset(name=PREFETCHED_MEDIA_KEY, mapping={"game": game_key, "media_ids": json.dumps(media_ids)})
+        pl.expire(name=PREFETCHED_MEDIA_KEY, time=PREFETCHED_MEDIA_TTL_SECS)
+        pl.execute()
+    except Exception as e:
+        raise ConnectionError("Could not store the prefetched media ids in redis") from e
+
+
+def pop_prefetched_media_ids(redis_client: redis.Redis) -> typing.Optional[typing.Tuple[str, typing.List[str]]]:
+    """
+    Get (and forget) the game key and twitter media ids which were uploaded ahead of time.
+    Returns None if nothing was prefetched, or if the media ids have expired.
+    """
+    try:
+        pl = redis_client.pipeline(transaction=True)
+        pl.hgetall(name=PREFETCHED_MEDIA_KEY)
+        pl.delete(PREFETCHED_MEDIA_KEY)
+        prefetched: typing.Dict[str, str] = pl.execute()[0]
+        if prefetched:
+            return prefetched["game"], json.loads(prefetched["media_ids"])
+        return None
+    except Exception as e:
+        raise ConnectionError("Could not get the prefetched media ids from redis") from e
+
+
+def clear_crawl_keys(redis_client: redis.Redis) -> None:
+    """
+    Delete the sharded crawl's bookkeeping keys.
+    """
+    try:
+        redis_client.delete(CRAWL_SHARDS_KEY, CRAWL_CLAIMED_KEY, CRAWL_TOTAL_KEY,
+                            CRAWL_DONE_KEY, CRAWL_RESULTS_KEY, CRAWL_BEARER_KEY)
+    except Exception as e:
+        raise ConnectionError("Could not clear the crawl keys from redis") from e
+
+
+def push_crawl_shards(redis_client: redis.Redis, shards: typing.List[typing.Any], bearer: str) -> None:
+    """
+    Start a new sharded crawl: push the given shards to the work queue, alongside the IGDB
+    bearer token the workers should use.
+    """
+    try:
+        clear_crawl_keys(redis_client=redis_client)
+        pl = redis_client.pipeline()
+        for shard in shards:
+            pl.rpush(CRAWL_SHARDS_KEY, json.dumps(shard))
+        pl.set(name=CRAWL_TOTAL_KEY, value=len(shards))
+        pl.set(name=CRAWL_BEARER_KEY, value=bearer)
+        for key in (CRAWL_SHARDS_KEY, CRAWL_TOTAL_KEY, CRAWL_BEARER_KEY):
+            pl.expire(name=key, time=CRAWL_KEYS_TTL_SECS)
+        pl.execute()
+    except Exception as e:
+        raise ConnectionError("Could not push the crawl shards to redis") from e
+
+
+def get_crawl_bearer(redis_client: redis.Redis) -> typing.Optional[str]:
+    """
+    Get the IGDB bearer token stored by the crawl coordinator.
+    """
+    try:
+        return redis_client.get(name=CRAWL_BEARER_KEY)
+    except Exception as e:
+        raise ConnectionError("Could not get the crawl bearer token from redis") from e
+
+
+def claim_crawl_shard(redis_client: redis.Redis,
+                      claim_timeout_secs: int = CRAWL_CLAIM_TIMEOUT_SECS) -> typing.Optional[str]:
+    """
+    Atomically move the next shard from the work queue to the claimed shards, and return it
+    as it's stored in redis. Returns None if there are no shards left. Unless it's completed
+    within the claim timeout, requeue_expired_crawl_shards() will return it to the work queue.
+    """
+    try:
+        return redis_client.eval(_CLAIM_SHARD_SCRIPT, 2, CRAWL_SHARDS_KEY, CRAWL_CLAIMED_KEY,
+                                 time.time() + claim_timeout_secs, CRAWL_KEYS_TTL_SECS)
+    except Exception as e:
+        raise ConnectionError("Could not claim a crawl shard from redis") from e
+
+
+def complete_crawl_shard(redis_client: redis.Redis, raw_shard: str,
+                         data_dicts: typing.List[typing.Dict[str, typing.Any]]) -> bool:
+    """
+    Store the given shard's accepted data dicts and mark the shard as done. If the shard was
+    already completed by another worker, its data dicts aren't stored again. Returns whether
+    this call completed the shard.
+    """
+    try:
+        return bool(redis_client.eval(_COMPLETE_SHARD_SCRIPT, 4, CRAWL_DONE_KEY, CRAWL_CLAIMED_KEY,
+                                      CRAWL_SHARDS_KEY, CRAWL_RESULTS_KEY, raw_shard, CRAWL_KEYS_TTL_SECS,
+                                      *[json.dumps(dd) for dd in data_dicts]))
+    except Exception as e:
+        raise ConnectionError("Could not complete a crawl shard in redis") from e
+
+
+def get_crawl_progress(redis_client: redis.Redis) -> typing.Tuple[int, int]:
+    """
+    Returns the (total, done) number of shards of the current crawl.
+    """
+    try:
+        pl = redis_client.pipeline(transaction=True)
+        pl.get(name=CRAWL_TOTAL_KEY)
+        pl.scard(CRAWL_DONE_KEY)
+        total, done = pl.execute()
+        return int(total or 0), int(done or 0)
+    except Exception as e:
+        raise ConnectionError("Could not get the crawl progress from redis") from e
+
+
+def requeue_expired_crawl_shards(redis_client: redis.Redis) -> int:
+    """
+    Move claimed shards whose deadline has passed, and which were never completed, back to the
+    work queue. Shards which are still within their deadline are left to their worker. Returns
+    the number of shards moved.
+    """
+    try:
+        return int(redis_client.eval(_REQUEUE_EXPIRED_SHARDS_SCRIPT, 3, CRAWL_CLAIMED_KEY, CRAWL_DONE_KEY,
+                                     CRAWL_SHARDS_KEY, time.time()))
+    except Exception as e:
+        raise ConnectionError("Could not requeue the expired crawl shards in redis") from e
+
+
+def get_crawl_results(redis_client: redis.Redis) -> typing.List[typing.Dict[str, typing.Any]]:
+    """
+    Get all of the data dicts accepted by the crawl workers.
+    """
+    try:
+        return [json.loads(r) for r in redis_client.lrange(name=CRAWL_RESULTS_KEY, start=0, end=-1)]
+    except Exception as e:
+        raise ConnectionError("Could not get the crawl results from redis") from e
+
+
+def acquire_rate_slot(redis_client: redis.Redis, requests_per_sec: int) -> None:
+    """
+    Block until a request may be sent without exceeding the given number of requests per second,
+    shared by every process using this redis instance.
+    """
+    try:
+        while True:
+            now: float = time.time()
+            key: str = CRAWL_RATE_KEY_PREFIX + str(int(now))
+            pl = redis_client.pipeline(transaction=True)
+            pl.incr(name=key)
+            pl.expire(name=key, time=2)
+            if pl.execute()[0] <= requests_per_sec:
+                return
+            time.sleep(1 - (now % 1))
+    except Exception as e:
+        raise ConnectionError("Could not acquire an IGDB rate slot from redis") from e
+
+
 if __name__ == "__main__":
     pass
\ No newline at end of file
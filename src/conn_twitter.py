@@ -9,7 +9,9 @@ class Twitter:
     Contains tokens and methods to access the Twitter API (v1.1 for media, v2 for tweeting).
     """
 
-    def __init__(self):
+    def __init__(self, session: typing.Optional[requests.Session] = None):
+        # a long-lived session keeps connections to Twitter open between requests
+        self.http: typing.Any = session if session else requests
         self.dev_api_key = environ.get("TWITTER_DEV_API_KEY")
         self.dev_api_secret = environ.get("TWITTER_DEV_API_SECRET")
         self.dev_user_id = environ.get("TWITTER_DEV_USER_ID")
@@ -29,7 +31,7 @@ class Twitter:
         media_ids: typing.List[str] = []
         try:
             for bin in image_binaries:
-                r = requests.post(url="https://upload.twitter.com/1.1/media/upload.json",
+                r = self.http.post(url="https://upload.twitter.com/1.1/media/upload.json",
                                   data={"media": bin, "media_category": "TWEET_IMAGE",
                                         "additional_owners": self.dev_user_id},
                                   auth=self.auth)
@@ -50,7 +52,7 @@ class Twitter:
         Tweet the given payload using the Twitter API.
         """
         try:
-            resp = requests.request(
+            resp = self.http.request(
                 "POST",
                 "https://api.twitter.com/2/tweets",
                 json=payload,
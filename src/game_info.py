@@ -1,9 +1,180 @@
 import typing
 import json
+import copy
 import base64
 import requests
+import logging
+import threading
+import src.images as image_prep
+from src.image_cache import ImageCache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pprint import pformat
+from types import MappingProxyType
+
+# the games endpoint's filters: a high enough rating, or enough ratings, and not an "Erotic" game
+MIN_TOTAL_RATING: int = 78
+MIN_TOTAL_RATING_COUNT: int = 15
+MIN_TOTAL_RATING_COUNT_UNRATED: int = 100
+EXCLUDED_THEME_ID: int = 42
+# IGDB's category of remakes
+REMAKE_CATEGORY: int = 8
+
+# IGDB genre / theme names and their hebrew translations
+HEB_GAME_GENRES_THEMES: typing.Mapping[str, str] = MappingProxyType({
+    "Fighting": "לחימה",
+    "Stealth": "התגנבות",
+    "Horror": "אימה",
+    "Action": "אקשן",
+    "Fantasy": "פנטזיה",
+    "Shooter": "ירי",
+    "Music": "קצב",
+    "Platform": "פלטפורמה",
+    "Puzzle": "פאזלים",
+    "Racing": "מירוצים",
+    "Real Time Strategy (RTS)": "אסטרטגיה בזמן-אמת",
+    "Role-playing (RPG)": "תפקידים",
+    "Simulator": "סימולציה",
+    "Strategy": "אסטרטגיה",
+    "Turn-based strategy (TBS)": "אסטרטגיה בתורים",
+    "Tactical": "טקטיקה",
+    "Quiz/Trivia": "טריוויה",
+    "Hack and slash/Beat 'em up": "האק-אנד-סלאש",
+    "Adventure": "הרפתקה",
+    "Arcade": "ארקייד",
+    "Visual Novel": "ויז'ואל נובל",
+    "Indie": "אינדי",
+    "Card & Board Game": "קלפים ולוח",
+    "MOBA": "מובה",
+    "Point-and-click": "פוינט-אנד-קליק"
+})
+
+# IGDB platform names and their hebrew (or shortened) names. Empty means "don't show"
+HEB_PLATFORMS: typing.Mapping[str, str] = MappingProxyType({
+    "PlayStation": "פס1",
+    "PlayStation 2": "פס2",
+    "PlayStation 3": "פס3",
+    "PlayStation 4": "פס4",
+    "PlayStation 5": "פס5",
+    "PlayStation Portable": "PSP",
+    "PlayStation Vita": "ויטה",
+    "PlayStation VR": "PSVR",
+    "PlayStation VR2": "PSVR2",
+    "PC (Microsoft Windows)": "פיסי",
+    "Sega Game Gear": "גיימגיר",
+    "Sega CD": "סגה סידי",
+    "Sega Master System/Mark III": "מאסטר סיסטם",
+    "Sega Saturn": "סגה סאטורן",
+    "Sega Mega Drive/Genesis": "מגה דרייב",
+    "3DO Interactive Multiplayer": "3DO",
+    "Dreamcast": "דרימקאסט",
+    "Atari 8-bit": "אטארי 8-ביט",
+    "Atari 2600": "אטארי 2600",
+    "Arcade": "ארקייד",
+    "Xbox": "אקסבוקס",
+    "Xbox Series X|S": "סירייס S|X",
+    "Xbox 360": "אקסבוקס 360",
+    "Xbox One": "אקסבוקס וואן",
+    "Nintendo Switch": "סוויץ'",
+    "Nintendo 64": "נינטנדו 64",
+    "Nintendo Entertainment System": "NES",
+    "Super Nintendo Entertainment System": "SNES",
+    "Nintendo 3DS": "3DS",
+    "Nintendo DS": "DS",
+    "Nintendo GameCube": "גיימקיוב",
+    "Wii": "ווי",
+    "Wii U": "ווי יו",
+    "Super Famicom": "סופר פאמיקום",
+    "Game Boy": "גיימבוי",
+    "Game Boy Color": "גיימבוי קולור",
+    "Game Boy Advance": "GBA",
+    "iOS": "אייפון",
+    "Android": "אנדרואיד",
+    "Google Stadia": "", "Linux": "", "Mac": "",
+    "Legacy Mobile Device": "",
+})
+
+# themes which may be used to fill the genres list, in order of preference
+FILLER_THEMES: typing.Tuple[str, ...] = ("Action", "Horror", "Stealth")
+
+# specific genre combinations and the "genres" list to be used instead. Matched in order
+GENRES_SPECIAL_CASES: typing.Tuple[typing.Tuple[typing.FrozenSet[str], typing.Tuple[str, ...]], ...] = (
+    (frozenset(("Racing", "Arcade")), ("Racing", "Arcade")),
+    (frozenset(("Platform", "Hack and slash/Beat 'em up", "Action")), ("Hack and slash/Beat 'em up", "Platform")),
+    (frozenset(("Strategy", "Hack and slash/Beat 'em up", "Adventure")), ("Hack and slash/Beat 'em up",)),
+    (frozenset(("Shooter", "Hack and slash/Beat 'em up", "Action")), ("Shooter", "Action", "Hack and slash/Beat 'em up")),
+    (frozenset(("Fighting", "Action")), ("Fighting",)),
+    (frozenset(("Puzzle", "Action")), ("Action", "Puzzle")),
+    (frozenset(("Puzzle", "Shooter")), ("Shooter", "Puzzle")),
+)
+
+
+class _ReadOnlyDict(dict):
+    """
+    A dict which can't be changed, so that writes to a snapshot fail loudly instead of being lost.
+    """
+
+    def _read_only(self, *args, **kwargs) -> typing.NoReturn:
+        raise TypeError("This dict is a read-only snapshot")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only  # type: ignore
+
+    # copies and pickles are plain, writable dicts
+    def __copy__(self) -> typing.Dict[str, typing.Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo: typing.Dict[int, typing.Any]) -> typing.Dict[str, typing.Any]:
+        return copy.deepcopy(dict(self), memo)
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        return dict, (dict(self),)
+
+
+class GameRecord:
+    """
+    A cleaned game data dict, stored in slots rather than a per-game dict so that
+    parsing many games at once stays cheap. Absent values are None.
+    """
+    __slots__ = ("name", "summary", "year", "cover", "artworks", "screenshots",
+                 "platforms", "themes", "genres", "developers", "publisher", "wiki_url")
+
+    def __init__(self, name: typing.Optional[str] = None, summary: typing.Optional[str] = None,
+                 year: typing.Optional[int] = None, cover: typing.Optional[typing.Dict[str, str]] = None,
+                 artworks: typing.Optional[typing.List[typing.Dict[str, str]]] = None,
+                 screenshots: typing.Optional[typing.List[typing.Dict[str, str]]] = None,
+                 platforms: typing.Optional[typing.List[str]] = None,
+                 themes: typing.Optional[typing.List[str]] = None,
+                 genres: typing.Optional[typing.List[str]] = None,
+                 developers: typing.Optional[typing.List[str]] = None,
+                 publisher: typing.Optional[str] = None, wiki_url: typing.Optional[str] = None):
+        self.name: typing.Optional[str] = name
+        self.summary: typing.Optional[str] = summary
+        self.year: typing.Optional[int] = year
+        self.cover: typing.Optional[typing.Dict[str, str]] = cover
+        self.artworks: typing.Optional[typing.List[typing.Dict[str, str]]] = artworks
+        self.screenshots: typing.Optional[typing.List[typing.Dict[str, str]]] = screenshots
+        self.platforms: typing.Optional[typing.List[str]] = platforms
+        self.themes: typing.Optional[typing.List[str]] = themes
+        self.genres: typing.List[str] = genres if genres is not None else []
+        self.developers: typing.List[str] = developers if developers is not None else []
+        self.publisher: typing.Optional[str] = publisher
+        self.wiki_url: typing.Optional[str] = wiki_url
+
+    @classmethod
+    def from_data_dict(cls, data_dict: typing.Dict[str, typing.Any]) -> "GameRecord":
+        """
+        Makes a record out of an already-cleaned game data dict. Unknown keys are ignored.
+        """
+        return cls(**{k: v for k, v in data_dict.items() if k in cls.__slots__})
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        """
+        Returns the cleaned game data dict this record holds, without the absent values.
+        """
+        return {k: v for k in GameRecord.__slots__ if (v := getattr(self, k)) is not None}
+
+    def __repr__(self) -> str:
+        return "GameRecord:\n" + pformat(self.as_dict())
 
 
 class GameInfo:
@@ -12,110 +183,62 @@ class GameInfo:
     images listed in the data dict.
     """
     MAX_TWITTER_URL_LENGTH: int = 23
+    # downloaded images are kept on disk, so retries and re-runs don't download them again.
+    # The cache is made on first use, once the env. variables are loaded.
+    _IMAGE_CACHE: typing.Optional[ImageCache] = None
+    _IMAGE_CACHE_LOADED: bool = False
+    _IMAGE_CACHE_LOCK: threading.Lock = threading.Lock()
 
-    def __init__(self, data_dict: typing.Dict[str, typing.Any]):
+    def __init__(self, data_dict: typing.Dict[str, typing.Any], dl_images: bool = True):
         try:
-            self.data_dict: typing.Dict[str, typing.Any] = GameInfo._clean_data_dict(
+            self.record: GameRecord = GameInfo._clean_data_dict_to_record(
                 data_dict)
-            self.images: typing.List[str] = self._dl_game_images_to_ram()
-            self.heb_game_genres_themes: typing.Dict[str, str] = {
-                "Fighting": "לחימה",
-                "Stealth": "התגנבות",
-                "Horror": "אימה",
-                "Action": "אקשן",
-                "Fantasy": "פנטזיה",
-                "Shooter": "ירי",
-                "Music": "קצב",
-                "Platform": "פלטפורמה",
-                "Puzzle": "פאזלים",
-                "Racing": "מירוצים",
-                "Real Time Strategy (RTS)": "אסטרטגיה בזמן-אמת",
-                "Role-playing (RPG)": "תפקידים",
-                "Simulator": "סימולציה",
-                "Strategy": "אסטרטגיה",
-                "Turn-based strategy (TBS)": "אסטרטגיה בתורים",
-                "Tactical": "טקטיקה",
-                "Quiz/Trivia": "טריוויה",
-                "Hack and slash/Beat 'em up": "האק-אנד-סלאש",
-                "Adventure": "הרפתקה",
-                "Arcade": "ארקייד",
-                "Visual Novel": "ויז'ואל נובל",
-                "Indie": "אינדי",
-                "Card & Board Game": "קלפים ולוח",
-                "MOBA": "מובה",
-                "Point-and-click": "פוינט-אנד-קליק"
-            }
-            self.heb_platforms: typing.Dict[str, str] = {
-                "PlayStation": "פס1",
-                "PlayStation 2": "פס2",
-                "PlayStation 3": "פס3",
-                "PlayStation 4": "פס4",
-                "PlayStation 5": "פס5",
-                "PlayStation Portable": "PSP",
-                "PlayStation Vita": "ויטה",
-                "PlayStation VR": "PSVR",
-                "PlayStation VR2": "PSVR2",
-                "PC (Microsoft Windows)": "פיסי",
-                "Sega Game Gear": "גיימגיר",
-                "Sega CD": "סגה סידי",
-                "Sega Master System/Mark III": "מאסטר סיסטם",
-                "Sega Saturn": "סגה סאטורן",
-                "Sega Mega Drive/Genesis": "מגה דרייב",
-                "3DO Interactive Multiplayer": "3DO",
-                "Dreamcast": "דרימקאסט",
-                "Atari 8-bit": "אטארי 8-ביט",
-                "Atari 2600": "אטארי 2600",
-                "Arcade": "ארקייד",
-                "Xbox": "אקסבוקס",
-                "Xbox Series X|S": "סירייס S|X",
-                "Xbox 360": "אקסבוקס 360",
-                "Xbox One": "אקסבוקס וואן",
-                "Nintendo Switch": "סוויץ'",
-                "Nintendo 64": "נינטנדו 64",
-                "Nintendo Entertainment System": "NES",
-                "Super Nintendo Entertainment System": "SNES",
-                "Nintendo 3DS": "3DS",
-                "Nintendo DS": "DS",
-                "Nintendo GameCube": "גיימקיוב",
-                "Wii": "ווי",
-                "Wii U": "ווי יו",
-                "Super Famicom": "סופר פאמיקום",
-                "Game Boy": "גיימבוי",
-                "Game Boy Color": "גיימבוי קולור",
-                "Game Boy Advance": "GBA",
-                "iOS": "אייפון",
-                "Android": "אנדרואיד",
-                "Google Stadia": "", "Linux": "", "Mac": "",
-                "Legacy Mobile Device": "",
-            }
+            self.images: typing.List[str] = self._dl_game_images_to_ram() if dl_images else []
         except Exception as e:
             raise Exception("Could not create a GameInfo object") from e
 
+    @property
+    def data_dict(self) -> typing.Dict[str, typing.Any]:
+        """
+        A read-only snapshot of the cleaned game data dict. To change it, assign a whole new dict.
+        """
+        return _ReadOnlyDict(self.record.as_dict())
+
+    @data_dict.setter
+    def data_dict(self, data_dict: typing.Dict[str, typing.Any]) -> None:
+        self.record = GameRecord.from_data_dict(data_dict)
+
     def __str__(self) -> str:
         """
         A string representation of a GameInfo instance. This is the text to be tweeted.
         """
+        return self.tweet_text()
+
+    def tweet_text(self, current_year: typing.Optional[int] = None) -> str:
+        """
+        The text to be tweeted, as if it were tweeted in the given year (by default, this year).
+        """
         try:
-            devs: typing.List[str] = self.data_dict.get("developers", None)
-            genres: typing.List[str] = self.data_dict.get("genres", None)
-            wiki_url: str = self.data_dict.get("wiki_url", None)
-            test_img: str = self.data_dict.get("cover", None)
-            pub: str = self.data_dict.get("publisher", None)
+            rec: GameRecord = self.record
+            devs: typing.List[str] = rec.developers
+            genres: typing.List[str] = rec.genres
+            wiki_url: typing.Optional[str] = rec.wiki_url
+            pub: typing.Optional[str] = rec.publisher
             devs_text: str = f"""מפתחת: {", ".join(devs[:2])}""" if devs else ""
             pub_text: str = f"""מפיצה: {pub}""" if pub else ""
             heb_genres: typing.List[str] = [
-                self.heb_game_genres_themes.get(g, "") for g in genres[:3]]
+                HEB_GAME_GENRES_THEMES.get(g, "") for g in genres[:3]]
             heb_genres = [g for g in heb_genres if g]
             wiki_text: str = f"""בוויקיפדיה: {wiki_url}""" + \
                 "\n" if wiki_url else "\n"
             release_text: str = "".join([
                 "מזל טוב ל-{}, שחוגג {} שנים לשחרורו! 🎂".format(
-                    self.data_dict["name"], datetime.now().year - self.data_dict["year"]),
+                    rec.name, (current_year or datetime.now().year) - rec.year),  # type: ignore
                 "\n",
                 "הוא יצא היום בשנת {}.".format(
-                    self.data_dict["year"])])
-            heb_platforms: typing.List[str] = [self.heb_platforms.get(
-                p, p) for p in self.data_dict["platforms"]]
+                    rec.year)])
+            heb_platforms: typing.List[str] = [HEB_PLATFORMS.get(
+                p, p) for p in rec.platforms]  # type: ignore
             info_text: str = "\n".join([
                 devs_text,
                 pub_text,
@@ -137,7 +260,7 @@ class GameInfo:
         Checks if the game is a remake of another game using the raw dict.
         """
         if (cat := raw_game_info_data_dict.get("category", None)):
-            if cat == 8:
+            if cat == REMAKE_CATEGORY:
                 return True
         return False
 
@@ -165,11 +288,23 @@ class GameInfo:
         except (IndexError, KeyError):
             raise
 
+    @staticmethod
+    def _is_well_rated(raw_game_info_data_dict: typing.Dict[str, typing.Any]) -> bool:
+        """
+        Checks the raw dict against the rating and theme filters the daily crawl asks IGDB to apply.
+        """
+        if any(t.get("id", None) == EXCLUDED_THEME_ID for t in raw_game_info_data_dict.get("themes", None) or []):
+            return False
+        rating: float = raw_game_info_data_dict.get("total_rating", None) or 0
+        rating_count: int = raw_game_info_data_dict.get("total_rating_count", None) or 0
+        return (rating >= MIN_TOTAL_RATING and rating_count >= MIN_TOTAL_RATING_COUNT)\
+            or rating_count >= MIN_TOTAL_RATING_COUNT_UNRATED
+
     def _get_image_dicts_from_data_dict(self, key: str, number_of_imgs: int) -> typing.List[typing.Dict[str, str]]:
         """
         Gets the first X single-image dictionaries with the given name from the data dict. 
         """
-        if dictlist := self.data_dict.get(key, None):
+        if dictlist := getattr(self.record, key, None):
             # grab first screenshot or artwork dict.
             return dictlist[:number_of_imgs]
         return []
@@ -199,31 +334,82 @@ class GameInfo:
             art_dicts: typing.List[typing.Dict[str, str]] = [
                 d for d in self._get_image_dicts_from_data_dict(key="artworks", number_of_imgs=2)]
             all_image_dicts: typing.List[typing.Dict[str, str]] = [
-                self.data_dict.get("cover")] + screens_dicts + art_dicts  # type: ignore
+                self.record.cover] + screens_dicts + art_dicts  # type: ignore
             return [_get_image_url_from_image_dict(d) for d in all_image_dicts if d]
         except Exception as e:
             raise ValueError(
                 "Could not extract image urls from GameInfo data dict") from e
 
+    @classmethod
+    def image_cache(cls) -> typing.Optional[ImageCache]:
+        """
+        Returns the shared image cache, or None if it's disabled. A malformed cache configuration
+        is logged, and disables the cache rather than failing the download.
+        """
+        with cls._IMAGE_CACHE_LOCK:
+            if not cls._IMAGE_CACHE_LOADED:
+                try:
+                    cls._IMAGE_CACHE = ImageCache.from_env()
+                except ValueError as e:
+                    logging.error(f"The image cache is disabled: {e}")
+                    cls._IMAGE_CACHE = None
+                cls._IMAGE_CACHE_LOADED = True
+            return cls._IMAGE_CACHE
+
     @staticmethod
-    def _dl_game_image_encode_b64(image_url: str = "") -> str:
+    def _dl_game_image(image_url: str = "") -> bytes:
         """
-        Downloads a single image from a URL as b64, then decodes it to a UTF-8 string.
+        Downloads a single image from a URL, unless it's already in the image cache. The cache is
+        best-effort: if it can't be read or written, the image is downloaded (and returned) anyway.
         """
         try:
-            return base64.b64encode(requests.get(url=image_url).content).decode('utf-8')
+            cache: typing.Optional[ImageCache] = GameInfo.image_cache()
+            key: typing.Optional[str] = ImageCache.key_for_url(image_url) if cache else None
+            if cache and key:
+                try:
+                    if (content := cache.get(key)) is not None:
+                        return content
+                except OSError as e:
+                    logging.warning(f"Could not read {key} from the image cache: {e!r}")
+            r: requests.Response = requests.get(url=image_url)
+            if cache and key and r.ok:
+                try:
+                    cache.put(key, r.content)
+                except OSError as e:
+                    logging.warning(f"Could not write {key} to the image cache: {e!r}")
+            return r.content
         except (ValueError, TypeError):
             raise
 
+    @staticmethod
+    def _dl_game_image_encode_b64(image_url: str = "") -> str:
+        """
+        Downloads a single image from a URL as b64, then decodes it to a UTF-8 string.
+        """
+        return base64.b64encode(GameInfo._dl_game_image(image_url)).decode('utf-8')
+
+    @staticmethod
+    def _dl_and_prepare_game_image(image_url: str = "") -> image_prep.PreparedImage:
+        """
+        Downloads a single image from a URL, then hashes it and shrinks it if it's too large for Twitter.
+        """
+        return image_prep.prepare_image(GameInfo._dl_game_image(image_url))
+
     def _dl_game_images_to_ram(self) -> typing.List[str]:
         """
-        Downloads this GameInfo's images to RAM.
+        Downloads this GameInfo's images to RAM, in parallel. Near-duplicate images are dropped, and
+        oversized ones are re-encoded. Returns the images as b64 UTF-8 strings.
         """
         try:
             image_urls: typing.List[str] = self._extract_image_urls_from_data_dict(
             )
-            utf8_images: typing.List[str] = [
-                GameInfo._dl_game_image_encode_b64(url) for url in image_urls]
+            if not image_urls:
+                return []
+            with ThreadPoolExecutor(max_workers=len(image_urls)) as pool:
+                prepared: typing.List[image_prep.PreparedImage] = list(
+                    pool.map(GameInfo._dl_and_prepare_game_image, image_urls))
+            utf8_images: typing.List[str] = [base64.b64encode(img.content).decode('utf-8')
+                                             for img in image_prep.drop_near_duplicates(prepared)]
             return utf8_images
         except Exception as e:
             raise Exception("Could not download GameInfo images to RAM") from e
@@ -236,27 +422,19 @@ class GameInfo:
         """
         try:
             if genres:  # add genres using the themes list, if there's room
-                for t in ("Action", "Horror", "Stealth"):
+                themes_set: typing.FrozenSet[str] = frozenset(themes)
+                for t in FILLER_THEMES:
                     if len(genres) < 3:
-                        if t in themes:
+                        if t in themes_set:
                             genres.append(t)
                     else:
                         break
 
-            # specific genre combinations and their "genres" list to be returned
-            special_cases: typing.Dict[typing.Tuple, typing.List[str]] = {
-                ("Racing", "Arcade"): ["Racing", "Arcade"],
-                ("Platform", "Hack and slash/Beat 'em up", "Action"): ["Hack and slash/Beat 'em up", "Platform"],
-                ("Strategy", "Hack and slash/Beat 'em up", "Adventure"): ["Hack and slash/Beat 'em up"],
-                ("Shooter", "Hack and slash/Beat 'em up", "Action"): ["Shooter", "Action", "Hack and slash/Beat 'em up"],
-                ("Fighting", "Action"): ["Fighting"],
-                ("Puzzle", "Action"): ["Action", "Puzzle"],
-                ("Puzzle", "Shooter"): ["Shooter", "Puzzle"],
-            }
-
-            for k in special_cases.keys():
-                if all(g in genres for g in k):
-                    genres = special_cases[k]
+            genres_set: typing.FrozenSet[str] = frozenset(genres)
+            for rule, replacement in GENRES_SPECIAL_CASES:
+                if rule <= genres_set:
+                    genres = list(replacement)
+                    genres_set = frozenset(replacement)
 
             return genres
         except (IndexError, KeyError, ValueError) as e:
@@ -267,33 +445,40 @@ class GameInfo:
         """
         Cleans and parses the given game data dict.
         """
+        return GameInfo._clean_data_dict_to_record(game_info_data_dict).as_dict()
+
+    @staticmethod
+    def _clean_data_dict_to_record(game_info_data_dict: typing.Dict[str, typing.Any]) -> GameRecord:
+        """
+        Cleans and parses the given game data dict into a GameRecord.
+        """
         try:
-            ret: typing.Dict[str, typing.Any] = {"developers": []}
+            rec: GameRecord = GameRecord()
 
             for key in ("name", "summary", "year", "cover", "artworks", "screenshots"):
                 if val := game_info_data_dict.get(key, None):
-                    ret[key] = val
+                    setattr(rec, key, val)
             for key in ("platforms", "themes", "genres"):
                 if val_dict := game_info_data_dict.get(key, None):
-                    ret[key] = [v.get("name", "") for v in val_dict]
+                    setattr(rec, key, [v.get("name", "") for v in val_dict])
 
-            ret["genres"] = GameInfo._clean_genres_list(
-                genres=ret.get("genres", []), themes=ret.get("themes", []))
+            rec.genres = GameInfo._clean_genres_list(
+                genres=rec.genres, themes=rec.themes or [])
 
             if companies := game_info_data_dict.get("involved_companies", None):
                 for d in companies:
                     if d["developer"]:
-                        ret["developers"].append(d["company"]["name"])
+                        rec.developers.append(d["company"]["name"])
                     if d["publisher"]:
-                        ret["publisher"] = d["company"]["name"]
+                        rec.publisher = d["company"]["name"]
 
             if websites := game_info_data_dict.get("websites", None):
                 for site in websites:
                     if site["category"] == 3:
-                        ret["wiki_url"] = site["url"]
+                        rec.wiki_url = site["url"]
                         break
 
-            return ret
+            return rec
         except KeyError as e:
             raise Exception("Could not clean GameInfo data dict") from e
 
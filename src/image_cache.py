@@ -0,0 +1,128 @@
+import typing
+import os
+import re
+import time
+import tempfile
+import threading
+import pathlib
+
+# IGDB image urls look like //images.igdb.com/igdb/image/upload/t_<size>/<image id>.<ext>
+IGDB_IMAGE_URL_RE: typing.Pattern = re.compile(r"/t_(?P<size>[A-Za-z0-9_]+)/(?P<image_id>[A-Za-z0-9_]+)\.(?P<ext>[A-Za-z0-9]+)$")
+TMP_FILE_PREFIX: str = ".tmp-"
+STALE_TMP_FILE_SECS: int = 60 * 60
+DEFAULT_MAX_BYTES: int = 256 * 1024 * 1024
+
+
+class ImageCache:
+    """
+    A persistent on-disk cache of downloaded IGDB images, keyed by image id and size template, with
+    a byte budget and least-recently-used eviction. Files are written atomically, so several
+    processes may share the same cache directory.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path: pathlib.Path = pathlib.Path(path)
+        self.max_bytes: int = max_bytes
+        self.hits: int = 0
+        self.misses: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> typing.Optional["ImageCache"]:
+        """
+        Makes a cache using the IMAGE_CACHE_DIR and IMAGE_CACHE_MAX_BYTES env. variables, if set.
+        Returns None if caching is disabled by setting either of them to an empty value, or the
+        byte budget to 0.
+        """
+        path: str = os.environ.get("IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "igdb-images"))
+        raw_max_bytes: str = os.environ.get("IMAGE_CACHE_MAX_BYTES", str(DEFAULT_MAX_BYTES)).strip()
+        if not path or not raw_max_bytes:
+            return None
+        try:
+            max_bytes: int = int(raw_max_bytes)
+        except ValueError as e:
+            raise ValueError(f"IMAGE_CACHE_MAX_BYTES should be a number of bytes, not {raw_max_bytes!r}") from e
+        return cls(path=path, max_bytes=max_bytes) if max_bytes > 0 else None
+
+    @staticmethod
+    def key_for_url(image_url: str) -> typing.Optional[str]:
+        """
+        Returns the cache key of an IGDB image url, or None if the url isn't an IGDB image url.
+        """
+        if m := IGDB_IMAGE_URL_RE.search(image_url):
+            return "{}.{}.{}".format(m["image_id"], m["size"], m["ext"])
+        return None
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        """
+        Returns the cached content under the given key, or None on a miss.
+        """
+        try:
+            p: pathlib.Path = self.path / key
+            content: bytes = p.read_bytes()
+            os.utime(p)     # mark as recently used
+            self._count(hit=True)
+            return content
+        except FileNotFoundError:
+            self._count(hit=False)
+            return None
+
+    def put(self, key: str, content: bytes) -> None:
+        """
+        Atomically stores the content under the given key, then evicts the least recently used
+        entries if the cache is over its byte budget.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=TMP_FILE_PREFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, self.path / key)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used entries until the cache fits its byte budget. Entries
+        removed at the same time by another process are skipped.
+        """
+        entries: typing.List[typing.Tuple[float, int, pathlib.Path]] = []
+        now: float = time.time()
+        for p in self.path.iterdir():
+            try:
+                st: os.stat_result = p.stat()
+                if p.name.startswith(TMP_FILE_PREFIX):
+                    if now - st.st_mtime > STALE_TMP_FILE_SECS:     # left by a crashed writer
+                        p.unlink()
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+            except FileNotFoundError:
+                continue
+        total: int = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+if __name__ == "__main__":
+    pass
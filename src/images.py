@@ -0,0 +1,97 @@
+import typing
+import io
+from PIL import Image, UnidentifiedImageError
+
+# Twitter's size limit for uploaded images, and the largest dimension worth uploading
+MAX_TWITTER_IMAGE_BYTES: int = 5 * 1024 * 1024
+MAX_IMAGE_DIMENSION: int = 4096
+# re-encoding qualities to try, in order, until the image fits
+JPEG_QUALITIES: typing.Tuple[int, ...] = (90, 80, 70, 60)
+# difference hashes (out of DHASH_SIZE ** 2 bits) this close are considered the same image
+DHASH_SIZE: int = 8
+NEAR_DUPLICATE_MAX_DISTANCE: int = 6
+
+
+class PreparedImage:
+    """
+    An image that's ready to be uploaded, with its perceptual hash (None if it couldn't be decoded).
+    """
+    __slots__ = ("content", "dhash")
+
+    def __init__(self, content: bytes, dhash: typing.Optional[int]):
+        self.content: bytes = content
+        self.dhash: typing.Optional[int] = dhash
+
+
+def dhash(img: Image.Image, size: int = DHASH_SIZE) -> int:
+    """
+    Returns the difference hash of the image: each bit tells if a pixel is brighter than its
+    right-hand neighbour, in a (size + 1) x size grayscale thumbnail.
+    """
+    pixels: typing.List[int] = list(img.convert("L").resize((size + 1, size), Image.BILINEAR).getdata())
+    h: int = 0
+    for row in range(size):
+        for col in range(size):
+            h = (h << 1) | int(pixels[row * (size + 1) + col] > pixels[row * (size + 1) + col + 1])
+    return h
+
+
+def _is_oversized(content: bytes, img: Image.Image) -> bool:
+    return len(content) > MAX_TWITTER_IMAGE_BYTES or max(img.size) > MAX_IMAGE_DIMENSION
+
+
+def _transcode(img: Image.Image) -> bytes:
+    """
+    Downscales the image to fit MAX_IMAGE_DIMENSION and re-encodes it as a progressive JPEG,
+    lowering the quality (and then the size) until it fits Twitter's limit.
+    """
+    if "transparency" in img.info:   # palette or color key transparency, e.g. in GIFs and PNGs
+        img = img.convert("RGBA")
+    if img.mode != "RGB":
+        if "A" in img.getbands():    # flatten transparency onto white
+            background: Image.Image = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img.convert("RGBA"), mask=img.convert("RGBA").getchannel("A"))
+            img = background
+        else:
+            img = img.convert("RGB")
+    img.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+    while True:
+        for quality in JPEG_QUALITIES:
+            buf: io.BytesIO = io.BytesIO()
+            img.save(buf, format="JPEG", quality=quality, progressive=True, optimize=True)
+            if buf.tell() <= MAX_TWITTER_IMAGE_BYTES:
+                return buf.getvalue()
+        img = img.resize((img.width // 2, img.height // 2), Image.LANCZOS)
+
+
+def prepare_image(content: bytes) -> PreparedImage:
+    """
+    Hashes the image, and transcodes it if it's too large for Twitter. Images which can't be
+    decoded are passed on as-is.
+    """
+    try:
+        with Image.open(io.BytesIO(content)) as img:
+            img.load()
+            h: int = dhash(img)
+            if _is_oversized(content, img):
+                content = _transcode(img)
+            return PreparedImage(content=content, dhash=h)
+    except (UnidentifiedImageError, OSError):
+        return PreparedImage(content=content, dhash=None)
+
+
+def drop_near_duplicates(images: typing.Iterable[PreparedImage],
+                         max_distance: int = NEAR_DUPLICATE_MAX_DISTANCE) -> typing.List[PreparedImage]:
+    """
+    Keeps the first of each group of near-identical images, preserving the given order.
+    """
+    kept: typing.List[PreparedImage] = []
+    for image in images:
+        if image.dhash is None or all(k.dhash is None or bin(image.dhash ^ k.dhash).count("1") > max_distance
+                                      for k in kept):
+            kept.append(image)
+    return kept
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,98 @@
+import typing
+import time
+from datetime import datetime, timedelta, timezone
+
+
+class CronTrigger:
+    """
+    A cron-style trigger, using the minute and hour fields of a cron expression (UTC).
+    Each field may be "*", "*/N", a number, or a comma-separated list of numbers.
+    The day-of-month, month and day-of-week fields, if given, must be "*".
+    """
+
+    def __init__(self, expression: str):
+        try:
+            fields: typing.List[str] = expression.split()
+            if len(fields) not in (2, 5) or any(f != "*" for f in fields[2:]):
+                raise ValueError(f"Unsupported cron expression {expression!r}")
+            self.expression: str = expression
+            self.minutes: typing.FrozenSet[int] = CronTrigger._parse_field(fields[0], 60)
+            self.hours: typing.FrozenSet[int] = CronTrigger._parse_field(fields[1], 24)
+        except Exception as e:
+            raise ValueError(f"Could not parse the cron expression {expression!r}") from e
+
+    @staticmethod
+    def _parse_field(field: str, size: int) -> typing.FrozenSet[int]:
+        """
+        Returns the values (out of 0 to size - 1) matched by a single cron field.
+        """
+        if field == "*":
+            return frozenset(range(size))
+        if field.startswith("*/"):
+            return frozenset(range(0, size, int(field[2:])))
+        values: typing.FrozenSet[int] = frozenset(int(v) for v in field.split(","))
+        if not all(0 <= v < size for v in values):
+            raise ValueError(f"Cron field {field!r} is out of range")
+        return values
+
+    def next_fire(self, after: datetime) -> datetime:
+        """
+        Returns the first time this trigger fires, strictly after the given time.
+        """
+        dt: datetime = after.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        while dt.hour not in self.hours or dt.minute not in self.minutes:
+            if dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            else:
+                dt += timedelta(minutes=1)
+        return dt
+
+    def __repr__(self) -> str:
+        return f"CronTrigger({self.expression!r})"
+
+
+class JobMetrics:
+    """
+    Run counters and timings of a single scheduled job.
+    """
+
+    def __init__(self, name: str):
+        self.name: str = name
+        self.runs: int = 0
+        self.early_exits: int = 0
+        self.errors: int = 0
+        self.running: bool = False
+        self.last_started: float = 0.0
+        self.last_duration_secs: float = 0.0
+        self.next_fire: typing.Optional[datetime] = None
+
+    def start(self) -> None:
+        self.running = True
+        self.last_started = time.time()
+
+    def finish(self, early_exit: bool = False, error: bool = False) -> None:
+        self.running = False
+        self.runs += 1
+        self.early_exits += int(early_exit)
+        self.errors += int(error)
+        self.last_duration_secs = time.time() - self.last_started
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        return {"runs": self.runs, "early_exits": self.early_exits, "errors": self.errors,
+                "running": self.running, "last_started": self.last_started,
+                "last_duration_secs": self.last_duration_secs,
+                "next_fire": self.next_fire.isoformat() if self.next_fire else None}
+
+    def as_prometheus(self) -> str:
+        """
+        Returns these metrics in the Prometheus text exposition format.
+        """
+        return "".join(f'bot_job_{k}{{job="{self.name}"}} {float(v)}\n' for k, v in (
+            ("runs_total", self.runs), ("early_exits_total", self.early_exits),
+            ("errors_total", self.errors), ("running", self.running),
+            ("last_started_timestamp", self.last_started),
+            ("last_duration_seconds", self.last_duration_secs)))
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,81 @@
+import pathlib
+import unittest
+import sys
+import random
+import logging
+from datetime import datetime, timedelta, timezone
+sys.path.append(str(pathlib.Path(__file__).parents[1] / "src"))
+from candidates import CandidateTable
+from run_daily import _filter_raw_game_data_dicts
+from src.conn_igdb import IGDB_Date
+from src.game_info import GameInfo
+
+def _random_raw_dicts(n, seed=0):
+    rnd = random.Random(seed)
+    dicts = []
+    for i in range(1, n + 1):
+        dd = {"id": i, "name": rnd.choice([f"Game {i}", f"Game {i} remake", f"Game {i} REMAKE"])}
+        if rnd.random() < 0.9:
+            dd["first_release_date"] = rnd.randint(-5 * 365 * 86400, 55 * 365 * 86400)
+        for key, values in (("category", [None, 0, 0, 8, 3]), ("parent_game", [None, i, i + 1]),
+                            ("total_rating", [None, 50.5, 77.99, 78, 90]),
+                            ("total_rating_count", [None, 0, 14, 15, 99, 100, 300])):
+            if (v := rnd.choice(values)) is not None:
+                dd[key] = v
+        dd["genres"] = [{"name": g} for g in rnd.sample(["Sport", "Shooter", "Puzzle", "Racing"], rnd.randint(0, 2))]
+        dd["themes"] = [{"id": t} for t in rnd.sample([1, 17, 42], rnd.randint(0, 2))]
+        dicts.append(dd)
+    return dicts
+
+def _per_dict_accepted_by_month_day(raw_dicts):
+    """ The daily crawl's per-dict path, applied to each game on its own release date. """
+    grouped = {}
+    for raw_dd in raw_dicts:
+        if (ts := raw_dd.get("first_release_date", None)) is None or not GameInfo._is_well_rated(raw_dd):
+            continue
+        released = datetime.fromtimestamp(ts, tz=timezone.utc)
+        lower = released.replace(hour=0, minute=0, second=0)
+        d = IGDB_Date(lower, lower + timedelta(hours=23))
+        if ts > d.upper_bound["ts"]:
+            continue
+        for dd in _filter_raw_game_data_dicts(raw_game_data_dicts=[dict(raw_dd)], d=d):
+            grouped.setdefault((released.month, released.day), []).append(dd)
+    return grouped
+
+class TestCandidateTable(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_same_as_per_dict_path(self):
+        raw_dicts = _random_raw_dicts(3000)
+        vectorized = CandidateTable(raw_dicts).accepted_by_month_day()
+        per_dict = _per_dict_accepted_by_month_day(raw_dicts)
+        self.assertEqual(vectorized.keys(), per_dict.keys())
+        for md in per_dict:
+            key = lambda dd: dd["id"]
+            self.assertListEqual(sorted(vectorized[md], key=key), sorted(per_dict[md], key=key))
+
+    def test_predicates(self):
+        raw_dicts = [{"id": 1, "parent_game": 2, "category": 8, "genres": [{"name": "Sport"}]},
+                     {"id": 2, "parent_game": 2, "genres": [{"name": "Shooter"}]}]
+        table = CandidateTable(raw_dicts)
+        for i, raw_dd in enumerate(raw_dicts):
+            self.assertEqual(table.is_remake()[i], GameInfo._is_remake(raw_dd))
+            self.assertEqual(table.is_parent()[i], GameInfo._is_parent(raw_dd))
+            self.assertEqual(table.is_sports()[i], GameInfo._is_sports(raw_dd))
+
+    def test_ranking(self):
+        ts = int(datetime(1990, 5, 17, tzinfo=timezone.utc).timestamp())
+        raw_dicts = [{"id": i, "name": str(i), "first_release_date": ts, "total_rating_count": c}
+                     for i, c in ((1, 100), (2, 300), (3, 200))]
+        ranked = CandidateTable(raw_dicts).accepted_by_month_day()
+        self.assertListEqual([dd["id"] for dd in ranked[(5, 17)]], [2, 3, 1])
+
+    def test_empty(self):
+        self.assertDictEqual(CandidateTable([]).accepted_by_month_day(), {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import asyncio
+import json
+import logging
+from unittest.mock import patch, Mock
+from src.scheduler import JobMetrics
+from run_daemon import _run_job, _schedule_job, _make_health_handler
+from run_hourly import run_hourly
+
+
+class TestRunJob(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def _run(self, func):
+        m = JobMetrics("some_job")
+        asyncio.run(_run_job(func=func, metrics=m))
+        return m.runs, m.early_exits, m.errors
+
+    def test_success(self):
+        self.assertEqual(self._run(lambda: None), (1, 0, 0))
+
+    def test_early_exit(self):
+        self.assertEqual(self._run(lambda: exit(0)), (1, 1, 0))
+
+    def test_error(self):
+        def fail():
+            raise ValueError("failed")
+        self.assertEqual(self._run(fail), (1, 0, 1))
+
+    def test_failed_exit(self):
+        self.assertEqual(self._run(lambda: exit(1)), (1, 0, 1))
+
+    @patch("src.conn_redis.claim_single_game_data_dict", return_value=None)
+    @patch("src.conn_redis.pop_prefetched_media_ids", return_value=None)
+    @patch("src.conn_redis.reap_inflight_game_data_dicts", return_value=(0, 0))
+    def test_hourly_empty_queue(self, *_):
+        self.assertEqual(self._run(lambda: run_hourly(twitter=Mock(), redis_client=Mock(), raise_errors=True)),
+                         (1, 1, 0))
+
+    @patch("src.conn_redis.reap_inflight_game_data_dicts", side_effect=ConnectionError("no redis"))
+    def test_hourly_failure(self, _):
+        self.assertEqual(self._run(lambda: run_hourly(twitter=Mock(), redis_client=Mock(), raise_errors=True)),
+                         (1, 0, 1))
+        self.assertRaises(SystemExit, run_hourly, Mock(), Mock())
+
+
+class TestHealthHandler(unittest.TestCase):
+    async def _get(self, port, path):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        response = (await reader.read()).decode("utf-8")
+        writer.close()
+        head, _, body = response.partition("\r\n\r\n")
+        return head.splitlines()[0], body
+
+    def test_endpoints(self):
+        async def run():
+            metrics = JobMetrics("some_job")
+            metrics.start()
+            metrics.finish(early_exit=True)
+            server = await asyncio.start_server(_make_health_handler([metrics]), host="127.0.0.1", port=0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                return [await self._get(port, path) for path in ("/health", "/metrics", "/nope")]
+            finally:
+                server.close()
+                await server.wait_closed()
+        (health_status, health), (metrics_status, metrics), (missing_status, _) = asyncio.run(run())
+        self.assertEqual(health_status, "HTTP/1.1 200 OK")
+        self.assertEqual(json.loads(health)["status"], "ok")
+        self.assertEqual(json.loads(health)["jobs"]["some_job"]["early_exits"], 1)
+        self.assertEqual(metrics_status, "HTTP/1.1 200 OK")
+        self.assertIn('bot_job_runs_total{job="some_job"} 1.0', metrics)
+        self.assertEqual(missing_status, "HTTP/1.1 404 Not Found")
+
+
+class TestScheduleJob(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.trigger = Mock()
+        self.trigger.next_fire.side_effect = lambda now: now     # always due
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_stopped_while_waiting_for_lock(self):
+        async def run():
+            job, metrics = Mock(), JobMetrics("some_job")
+            jobs_lock, stop = asyncio.Lock(), asyncio.Event()
+            await jobs_lock.acquire()   # another job is running
+            task = asyncio.create_task(_schedule_job(func=job, trigger=self.trigger, metrics=metrics,
+                                                     jobs_lock=jobs_lock, stop=stop))
+            await asyncio.sleep(0.05)
+            stop.set()
+            jobs_lock.release()
+            await asyncio.wait_for(task, timeout=1)
+            return job, metrics
+        job, metrics = asyncio.run(run())
+        job.assert_not_called()
+        self.assertEqual(metrics.runs, 0)
+
+    def test_runs_until_stopped(self):
+        async def run():
+            metrics, jobs_lock, stop = JobMetrics("some_job"), asyncio.Lock(), asyncio.Event()
+            job = Mock(side_effect=lambda: stop.set() if job.call_count >= 2 else None)
+            await asyncio.wait_for(_schedule_job(func=job, trigger=self.trigger, metrics=metrics,
+                                                 jobs_lock=jobs_lock, stop=stop), timeout=1)
+            return job, metrics, jobs_lock
+        job, metrics, jobs_lock = asyncio.run(run())
+        self.assertEqual(job.call_count, 2)
+        self.assertEqual((metrics.runs, metrics.errors), (2, 0))
+        self.assertFalse(jobs_lock.locked())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,215 @@
+import unittest
+import re
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, Mock
+import src.conn_redis as conn_redis
+from run_daily import run_daily, run_daily_streaming, run_daily_lookahead, _prepare_dates_list, _prepare_lookahead_dates_list,\
+    _lookahead_posting_day, _validate_event
+try:
+    import fakeredis
+except ImportError:     # the redis behaviour tests need fakeredis[lua]
+    fakeredis = None
+
+
+@unittest.skipUnless(fakeredis, "fakeredis isn't installed")
+class TestRunDailyStreaming(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.rc = fakeredis.FakeRedis(decode_responses=True)
+        self.rc.set("yesterday's game", json.dumps({"name": "yesterday's game"}))
+        self.rc.hset(conn_redis.INFLIGHT_GAMES_KEY, "claimed game", "{}")
+        self.rc.hset(conn_redis.PREFETCHED_MEDIA_KEY, mapping={"game": "claimed game", "media_ids": "[]"})
+        self.igdb_client = Mock()
+        self.calls = 0
+
+        def iter_games_endpoint(raw_body):
+            self.calls += 1
+            return iter([{"name": f"game {self.calls}"},
+                         {"name": f"dlc {self.calls}", "id": 2, "parent_game": 1},
+                         {"name": f"sports game {self.calls}", "genres": [{"name": "Sport"}]},
+                         {"name": f"old game {self.calls}", "category": 8}])
+        self.igdb_client.iter_games_endpoint.side_effect = iter_games_endpoint
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_only_filtered_games_stored(self):
+        run_daily_streaming(igdb_client=self.igdb_client, redis_client=self.rc, batch_size=7)
+        games = [k for k in self.rc.keys() if not k.startswith(conn_redis.RESERVED_KEY_PREFIXES)]
+        self.assertCountEqual(games, [f"game {i}" for i in range(1, self.calls + 1)]
+                              + [f"old game {i} Remake" for i in range(1, self.calls + 1)])
+        self.assertIn("year", json.loads(self.rc.get("game 1")))
+        self.assertFalse(self.rc.exists(conn_redis.STAGING_GAMES_KEY))
+        # yesterday's in-flight game and prefetched media ids are dropped, like in the other crawls
+        self.assertFalse(self.rc.exists(conn_redis.INFLIGHT_GAMES_KEY, conn_redis.PREFETCHED_MEDIA_KEY))
+
+    def test_failed_crawl_keeps_queue(self):
+        iter_games_endpoint = self.igdb_client.iter_games_endpoint.side_effect
+
+        def fail_midway(raw_body):
+            if self.calls == 3:
+                raise ConnectionError("IGDB is down")
+            return iter_games_endpoint(raw_body)
+        self.igdb_client.iter_games_endpoint.side_effect = fail_midway
+        self.assertRaises(SystemExit, run_daily_streaming, self.igdb_client, self.rc, 2)
+        games = [k for k in self.rc.keys() if not k.startswith(conn_redis.RESERVED_KEY_PREFIXES)]
+        self.assertListEqual(games, ["yesterday's game"])
+        self.assertEqual(self.rc.hget(conn_redis.INFLIGHT_GAMES_KEY, "claimed game"), "{}")
+
+
+@unittest.skipUnless(fakeredis, "fakeredis isn't installed")
+class TestRunDaily(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_only_posting_queue_replaced(self):
+        rc = fakeredis.FakeRedis(decode_responses=True)
+        rc.set("yesterday's game", json.dumps({"name": "yesterday's game"}))
+        conn_redis.push_crawl_shards(redis_client=rc, shards=[[[0, 1]]], bearer="token")
+        rc.hset(conn_redis.DAY_QUEUE_KEY_PREFIX + "2023-03-02", "tomorrow's game", "{}")
+        igdb_client = Mock()
+        igdb_client.get_games_endpoint.side_effect = lambda raw_body: [
+            {"name": f"game {igdb_client.get_games_endpoint.call_count}"}]
+        run_daily(igdb_client=igdb_client, redis_client=rc)
+        games = [k for k in rc.keys() if not k.startswith(conn_redis.RESERVED_KEY_PREFIXES)]
+        self.assertCountEqual(games, [f"game {i}" for i in range(1, igdb_client.get_games_endpoint.call_count + 1)])
+        self.assertEqual(conn_redis.get_crawl_progress(redis_client=rc), (1, 0))
+        self.assertEqual(rc.hget(conn_redis.DAY_QUEUE_KEY_PREFIX + "2023-03-02", "tomorrow's game"), "{}")
+
+
+@unittest.skipUnless(fakeredis, "fakeredis isn't installed")
+class TestRunDailyLookahead(unittest.TestCase):
+    FIRST_DAY: datetime = datetime(2023, 3, 10, 5, tzinfo=timezone.utc)
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.rc = fakeredis.FakeRedis(decode_responses=True)
+        self.igdb_client = Mock()
+        # a game released on each of the first three days of the window, in 1990 and 1991
+        dataset = [{"name": f"game {released.date().isoformat()}", "first_release_date": int(released.timestamp())}
+                   for year in range(1990, 1992) for i in range(3)
+                   for released in [self.FIRST_DAY.replace(year=year, hour=12) + timedelta(days=i)]]
+
+        def get_games_endpoint(raw_body):
+            lower, upper = map(int, re.findall(r"first_release_date [<>]= (\d+)", raw_body))
+            return [dict(raw_dd) for raw_dd in dataset if lower <= raw_dd["first_release_date"] <= upper]
+        self.igdb_client.get_games_endpoint.side_effect = get_games_endpoint
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def _run_on(self, now):
+        class _Datetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return now
+        with patch("run_daily.datetime", _Datetime):
+            run_daily_lookahead(days=3, igdb_client=self.igdb_client, redis_client=self.rc)
+
+    def _games(self):
+        return [k for k in self.rc.keys() if not k.startswith(conn_redis.RESERVED_KEY_PREFIXES)]
+
+    def test_consecutive_days(self):
+        self._run_on(self.FIRST_DAY)
+        crawl_requests = self.igdb_client.get_games_endpoint.call_count
+        self.assertGreater(crawl_requests, 0)
+        self.assertCountEqual(self._games(), ["game 1990-03-10", "game 1991-03-10"])
+        self.assertEqual(json.loads(self.rc.get("game 1990-03-10"))["year"], 1990)
+        # promoting today's queue leaves the other days' queues alone
+        self.assertSetEqual(self.rc.smembers(conn_redis.FILLED_DAYS_KEY), {"2023-03-11", "2023-03-12"})
+        self.assertCountEqual(self.rc.hkeys(conn_redis.DAY_QUEUE_KEY_PREFIX + "2023-03-11"),
+                              ["game 1990-03-11", "game 1991-03-11"])
+        self.assertCountEqual(self.rc.hkeys(conn_redis.DAY_QUEUE_KEY_PREFIX + "2023-03-12"),
+                              ["game 1990-03-12", "game 1991-03-12"])
+
+        self._run_on(self.FIRST_DAY + timedelta(days=1))
+        self.assertEqual(self.igdb_client.get_games_endpoint.call_count, crawl_requests)
+        self.assertCountEqual(self._games(), ["game 1990-03-11", "game 1991-03-11"])
+        self.assertSetEqual(self.rc.smembers(conn_redis.FILLED_DAYS_KEY), {"2023-03-12"})
+        self.assertFalse(self.rc.exists(conn_redis.DAY_QUEUE_KEY_PREFIX + "2023-03-11"))
+        self.assertCountEqual(self.rc.hkeys(conn_redis.DAY_QUEUE_KEY_PREFIX + "2023-03-12"),
+                              ["game 1990-03-12", "game 1991-03-12"])
+
+
+class TestLookahead(unittest.TestCase):
+    """
+    The lookahead crawl should queue the same games, with the same release years, for each day of
+    its window as the daily crawl would on that day.
+    """
+    @staticmethod
+    def _dataset(on, days):
+        # games released on and around each day of the window, in every year, at times around the cutoff
+        return [{"name": f"{dt.isoformat()}", "first_release_date": int(dt.timestamp())}
+                for y in range(1968, on.year + 1) for i in range(-2, days + 2)
+                for dt in [datetime(y, 1, 1, tzinfo=timezone.utc)
+                           + timedelta(days=(on - datetime(on.year, 1, 1, tzinfo=timezone.utc)).days + i,
+                                       hours=h, minutes=m)
+                           for h, m in ((0, 0), (12, 0), (23, 0), (23, 30))]]
+
+    @staticmethod
+    def _query(dataset, d):
+        return [dict(raw_dd) for raw_dd in dataset
+                if d.lower_bound["ts"] <= raw_dd["first_release_date"] <= d.upper_bound["ts"]]
+
+    def _assert_same_as_daily(self, on, days):
+        dataset = self._dataset(on, days)
+        lookahead = {(on + timedelta(days=i)).date().isoformat(): set() for i in range(days)}
+        for d in _prepare_lookahead_dates_list(days=days, on=on):
+            for raw_dd in self._query(dataset, d):
+                if day := _lookahead_posting_day(raw_dd, today=on, days=days):
+                    lookahead[day].add((raw_dd["name"], raw_dd["year"]))
+        for i in range(days):
+            day = on + timedelta(days=i)
+            daily = {(raw_dd["name"], d.lower_bound["dt"].year)
+                     for d in _prepare_dates_list(on=day) for raw_dd in self._query(dataset, d)}
+            self.assertTrue(daily, day)
+            self.assertSetEqual(lookahead[day.date().isoformat()], daily, day)
+
+    def test_window(self):
+        self._assert_same_as_daily(datetime(2023, 3, 10, 5, tzinfo=timezone.utc), days=7)
+
+    def test_year_wrap(self):
+        self._assert_same_as_daily(datetime(2023, 12, 28, 5, tzinfo=timezone.utc), days=7)
+
+    def test_leap_day(self):
+        self._assert_same_as_daily(datetime(2024, 2, 26, tzinfo=timezone.utc), days=7)
+        self._assert_same_as_daily(datetime(2024, 2, 29, tzinfo=timezone.utc), days=2)
+        self._assert_same_as_daily(datetime(2023, 2, 26, tzinfo=timezone.utc), days=7)
+
+    def test_jan_1970_covered_on_wrap(self):
+        dates = _prepare_lookahead_dates_list(days=7, on=datetime(2023, 12, 29, tzinfo=timezone.utc))
+        self.assertEqual(dates[0].lower_bound["dt"], datetime(1970, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(dates[0].upper_bound["dt"], datetime(1970, 1, 4, 23, tzinfo=timezone.utc))
+
+    def test_cutoff_and_recent_years(self):
+        today = datetime(2023, 3, 10, tzinfo=timezone.utc)
+        self.assertIsNone(_lookahead_posting_day(
+            {"first_release_date": int(datetime(2000, 3, 11, 23, 30, tzinfo=timezone.utc).timestamp())}, today, 7))
+        self.assertEqual(_lookahead_posting_day(
+            {"first_release_date": int(datetime(2000, 3, 11, 23, tzinfo=timezone.utc).timestamp())}, today, 7),
+            "2023-03-11")
+        self.assertIsNone(_lookahead_posting_day(
+            {"first_release_date": int(datetime(2021, 3, 11, tzinfo=timezone.utc).timestamp())}, today, 7))
+        self.assertIsNone(_lookahead_posting_day(
+            {"first_release_date": int(datetime(2000, 3, 20, tzinfo=timezone.utc).timestamp())}, today, 7))
+
+
+class TestValidateEvent(unittest.TestCase):
+    def test_valid(self):
+        for event in (None, {}, {"stream": True}, {"lookahead_days": 7}, {"lookahead_days": "1"},
+                      {"stream": False, "lookahead_days": 3}):
+            _validate_event(event)
+
+    def test_invalid(self):
+        for event in ({"lookahead_days": 0}, {"lookahead_days": -3}, {"lookahead_days": "a week"},
+                      {"stream": True, "lookahead_days": 7}):
+            self.assertRaises(ValueError, _validate_event, event)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -56,6 +56,49 @@ class TestDLGameImageEncodeB64(unittest.TestCase):
         gi = game_info.GameInfo(data_dict={})
         self.assertRaises((ValueError, TypeError), gi._dl_game_image_encode_b64, "...")
 
+class TestDLGameImage(unittest.TestCase):
+    @patch("requests.get")
+    def test_cached_image_not_downloaded(self, mock_get):
+        import tempfile
+        from image_cache import ImageCache
+        url = "https://images.igdb.com/igdb/image/upload/t_original/co1abc.jpg"
+        resp = Mock(ok=True, content=b"some image")
+        mock_get.return_value = resp
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch.object(game_info.GameInfo, "image_cache", return_value=ImageCache(path=tmp_dir, max_bytes=1024)):
+                self.assertEqual(game_info.GameInfo._dl_game_image(url), b"some image")
+                self.assertEqual(game_info.GameInfo._dl_game_image(url), b"some image")
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch("requests.get")
+    def test_broken_cache_still_downloads(self, mock_get):
+        import tempfile
+        from image_cache import ImageCache
+        url = "https://images.igdb.com/igdb/image/upload/t_original/co1abc.jpg"
+        mock_get.return_value = Mock(ok=True, content=b"some image")
+        with tempfile.NamedTemporaryFile() as not_a_dir:     # the cache path is a file
+            with patch.object(game_info.GameInfo, "image_cache", return_value=ImageCache(path=not_a_dir.name, max_bytes=1024)):
+                with self.assertLogs(level="WARNING") as logs:
+                    self.assertEqual(game_info.GameInfo._dl_game_image(url), b"some image")
+        self.assertEqual(len(logs.records), 2)     # a failed read, then a failed write
+
+class TestImageCache(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.multiple(game_info.GameInfo, _IMAGE_CACHE=None, _IMAGE_CACHE_LOADED=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_made_on_first_use(self):
+        with patch.dict("os.environ", {"IMAGE_CACHE_DIR": "/tmp/some-cache", "IMAGE_CACHE_MAX_BYTES": "1024"}):
+            cache = game_info.GameInfo.image_cache()
+        self.assertEqual((str(cache.path), cache.max_bytes), ("/tmp/some-cache", 1024))
+        self.assertIs(game_info.GameInfo.image_cache(), cache)
+
+    def test_malformed_max_bytes_disables_cache(self):
+        with patch.dict("os.environ", {"IMAGE_CACHE_MAX_BYTES": "256MB"}):
+            with self.assertLogs(level="ERROR"):
+                self.assertIsNone(game_info.GameInfo.image_cache())
+
 class TestCleanGenresList(unittest.TestCase):
     def test_add_themes_triggered(self):
         gi = game_info.GameInfo(data_dict={})
@@ -77,6 +120,16 @@ class TestCleanGenresList(unittest.TestCase):
         res = gi._clean_genres_list(genres=["Action", "Fighting"], themes=[])
         self.assertListEqual(res, ["Fighting"])
 
+    def test_chained_special_cases(self):
+        """ Later rules are matched against the genres list replaced by earlier rules """
+        gi = game_info.GameInfo(data_dict={})
+        res = gi._clean_genres_list(genres=["Platform", "Hack and slash/Beat 'em up", "Action", "Fighting"], themes=[])
+        self.assertListEqual(res, ["Hack and slash/Beat 'em up", "Platform"])
+        res = gi._clean_genres_list(genres=["Shooter", "Hack and slash/Beat 'em up", "Action", "Puzzle"], themes=[])
+        self.assertListEqual(res, ["Shooter", "Action", "Hack and slash/Beat 'em up"])
+        res = gi._clean_genres_list(genres=["Racing", "Arcade", "Puzzle", "Action"], themes=[])
+        self.assertListEqual(res, ["Racing", "Arcade"])
+
 class TestCleanDataDict(unittest.TestCase):
     """ 
     Note: these tests assume the constructor calls the clean_data_dict method.
@@ -87,6 +140,23 @@ class TestCleanDataDict(unittest.TestCase):
         # we want to see the value unchanged
         self.assertEqual(gi.data_dict["name"], "val")
 
+    def test_data_dict_is_read_only(self):
+        gi = game_info.GameInfo(data_dict={"name": "val"})
+        with self.assertRaises(TypeError):
+            gi.data_dict["name"] = "other val"
+        gi.data_dict = {"name": "other val"}
+        self.assertEqual(gi.data_dict["name"], "other val")
+
+    def test_data_dict_copies_are_plain_dicts(self):
+        import copy
+        import pickle
+        gi = game_info.GameInfo(data_dict={"name": "val", "platforms": [{"name": "p1"}]})
+        for c in (copy.copy(gi.data_dict), copy.deepcopy(gi.data_dict), pickle.loads(pickle.dumps(gi.data_dict))):
+            self.assertIs(type(c), dict)
+            self.assertDictEqual(c, gi.data_dict)
+            c["name"] = "other val"
+        self.assertEqual(gi.data_dict["name"], "val")
+
     def test_irrelevant_key_exists_in_raw_dict(self):
         gi = game_info.GameInfo(data_dict={"bogus_key": "val"})  
         assert "bogus_key" not in gi.data_dict
@@ -106,5 +176,26 @@ class TestCleanDataDict(unittest.TestCase):
         "platforms": ["p1", "p2"]}
         self.assertDictEqual(expected_cleaned_d, gi.data_dict)
 
+class TestTweetText(unittest.TestCase):
+    def test_current_year(self):
+        gi = game_info.GameInfo(data_dict={"name": "some_name", "year": 2000, "platforms": [{"name": "Wii"}]})
+        tweet = gi.tweet_text(current_year=2010)
+        assert "10" in tweet.splitlines()[0]
+        assert "2000" in tweet.splitlines()[1]
+
+class TestGameRecord(unittest.TestCase):
+    def test_dict_round_trip(self):
+        d = {"name": "some_name", "year": 1998, "genres": ["g1"], "developers": [], "platforms": ["p1"]}
+        rec = game_info.GameRecord.from_data_dict(d)
+        self.assertDictEqual(rec.as_dict(), d)
+
+    def test_unknown_keys_ignored(self):
+        rec = game_info.GameRecord.from_data_dict({"name": "some_name", "bogus_key": "val"})
+        assert "bogus_key" not in rec.as_dict()
+
+    def test_no_instance_dict(self):
+        rec = game_info.GameRecord()
+        self.assertRaises(AttributeError, setattr, rec, "bogus_key", "val")
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import json
+import logging
+from unittest.mock import patch, Mock
+import src.conn_redis as conn_redis
+from src.game_info import GameInfo
+from run_hourly import run_hourly, run_prefetch
+try:
+    import fakeredis
+except ImportError:     # the redis behaviour tests need fakeredis[lua]
+    fakeredis = None
+
+
+def _game(name):
+    return {"name": name, "year": 2000, "platforms": [{"name": "Wii"}]}
+
+
+@unittest.skipUnless(fakeredis, "fakeredis isn't installed")
+class TestRunHourly(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.rc = fakeredis.FakeRedis(decode_responses=True)
+        self.twitter = Mock()
+        self.twitter.upload_images.return_value = ["uploaded 1", "uploaded 2"]
+        self.twitter.tweet.return_value = {"data": {"id": "1"}}
+        patcher = patch.object(GameInfo, "_dl_game_images_to_ram", return_value=["image 1", "image 2"])
+        self.mock_dl = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def _queue(self, *names):
+        conn_redis.store_raw_game_data_dicts(redis_client=self.rc, data_dicts=[_game(n) for n in names])
+
+    def _tweeted_media_ids(self):
+        return self.twitter.make_tweet.call_args.kwargs["media_ids"]
+
+    def test_prefetched(self):
+        self._queue("some game")
+        conn_redis.store_prefetched_media_ids(redis_client=self.rc, game_key="some game",
+                                              media_ids=["prefetched 1", "prefetched 2"])
+        run_hourly(twitter=self.twitter, redis_client=self.rc)
+        self.twitter.tweet.assert_called_once()
+        self.assertIn("some game", self.twitter.make_tweet.call_args.kwargs["tweet_text"])
+        self.assertListEqual(self._tweeted_media_ids(), ["prefetched 1", "prefetched 2"])
+        self.twitter.upload_images.assert_not_called()
+        self.mock_dl.assert_not_called()
+        self.assertIsNone(self.rc.get("some game"))
+        self.assertFalse(self.rc.exists(conn_redis.PREFETCHED_MEDIA_KEY, conn_redis.INFLIGHT_GAMES_KEY))
+
+    def test_prefetched_game_gone(self):
+        self._queue("some game")
+        conn_redis.store_prefetched_media_ids(redis_client=self.rc, game_key="posted game",
+                                              media_ids=["prefetched 1"])
+        run_hourly(twitter=self.twitter, redis_client=self.rc)
+        self.assertIn("some game", self.twitter.make_tweet.call_args.kwargs["tweet_text"])
+        self.mock_dl.assert_called_once()
+        self.twitter.upload_images.assert_called_once_with(image_binaries=["image 1", "image 2"])
+        self.assertListEqual(self._tweeted_media_ids(), ["uploaded 1", "uploaded 2"])
+        self.assertIsNone(self.rc.get("some game"))
+
+    def test_nothing_prefetched(self):
+        self._queue("some game")
+        run_hourly(twitter=self.twitter, redis_client=self.rc)
+        self.twitter.upload_images.assert_called_once()
+        self.assertListEqual(self._tweeted_media_ids(), ["uploaded 1", "uploaded 2"])
+
+    def test_next_game_prefetched(self):
+        self._queue("some game", "other game")
+        run_hourly(twitter=self.twitter, redis_client=self.rc)
+        tweeted = "some game" if "some game" in self.twitter.make_tweet.call_args.kwargs["tweet_text"] else "other game"
+        left = ({"some game", "other game"} - {tweeted}).pop()
+        self.assertEqual(conn_redis.pop_prefetched_media_ids(redis_client=self.rc), (left, ["uploaded 1", "uploaded 2"]))
+        self.assertIsNotNone(self.rc.get(left))
+
+    def _expire_inflight(self):
+        for key in self.rc.zrange(conn_redis.INFLIGHT_DEADLINES_KEY, 0, -1):
+            self.rc.zadd(conn_redis.INFLIGHT_DEADLINES_KEY, {key: 0})
+
+    def _assert_redelivered_after_failure(self):
+        self.assertIsNone(self.rc.get("some game"))
+        self.assertListEqual(self.rc.hkeys(conn_redis.INFLIGHT_GAMES_KEY), ["some game"])
+        self._expire_inflight()
+        self.assertEqual(conn_redis.reap_inflight_game_data_dicts(redis_client=self.rc), (1, 0))
+        self.assertDictEqual(json.loads(self.rc.get("some game")), _game("some game"))
+
+    def test_tweet_rejected(self):
+        self._queue("some game")
+        self.twitter.tweet.return_value = {"errors": ["some error"]}
+        self.assertRaises(SystemExit, run_hourly, self.twitter, self.rc)
+        self._assert_redelivered_after_failure()
+
+    def test_tweet_failed(self):
+        self._queue("some game")
+        self.twitter.tweet.side_effect = ConnectionError("twitter is down")
+        self.assertRaises(SystemExit, run_hourly, self.twitter, self.rc)
+        self._assert_redelivered_after_failure()
+        # the next run posts it
+        self.twitter.tweet.side_effect = None
+        self.twitter.tweet.return_value = {"data": {"id": "1"}}
+        self._expire_inflight()
+        run_hourly(twitter=self.twitter, redis_client=self.rc)
+        self.assertIsNone(self.rc.get("some game"))
+        self.assertEqual(self.rc.hget(conn_redis.INFLIGHT_ATTEMPTS_KEY, "some game"), None)
+
+    def test_tweeted_game_acknowledged(self):
+        self._queue("some game")
+        run_hourly(twitter=self.twitter, redis_client=self.rc)
+        self.assertFalse(self.rc.exists(conn_redis.INFLIGHT_GAMES_KEY, conn_redis.INFLIGHT_DEADLINES_KEY,
+                                        conn_redis.INFLIGHT_ATTEMPTS_KEY))
+        self._expire_inflight()
+        self.assertRaises(SystemExit, run_hourly, self.twitter, self.rc)   # nothing left to post
+        self.twitter.tweet.assert_called_once()
+
+    def test_run_prefetch(self):
+        self._queue("some game")
+        run_prefetch(twitter=self.twitter, redis_client=self.rc)
+        self.twitter.tweet.assert_not_called()
+        self.assertEqual(conn_redis.pop_prefetched_media_ids(redis_client=self.rc),
+                         ("some game", ["uploaded 1", "uploaded 2"]))
+        self.assertDictEqual(json.loads(self.rc.get("some game")), _game("some game"))
+
+    def test_run_prefetch_upload_failed(self):
+        self._queue("some game")
+        self.twitter.upload_images.return_value = ["uploaded 1", None]
+        self.assertRaises(SystemExit, run_prefetch, self.twitter, self.rc)
+        self.assertIsNone(conn_redis.pop_prefetched_media_ids(redis_client=self.rc))
+
+
+if __name__ == "__main__":
+    unittest.main()
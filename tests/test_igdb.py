@@ -5,7 +5,7 @@ import sys
 import json
 from os import environ
 sys.path.append(str(pathlib.Path(__file__).parents[1] / "src"))
-from conn_igdb import IGDB
+from conn_igdb import IGDB, _iter_json_array
 from unittest.mock import patch, Mock
 from dotenv import load_dotenv
 
@@ -63,5 +63,36 @@ class TestGetGamesEndpoint(unittest.TestCase):
         mock_post.configure_mock(return_value=expected_r)
         self.assertRaises(ValueError, igdb.get_games_endpoint, raw_body="fields *")
 
+class TestIterJsonArray(unittest.TestCase):
+    def test_split_chunks(self):
+        raw = json.dumps([{"id": i, "name": "some ]name, " + str(i)} for i in range(20)])
+        for n in (1, 5, 1000):
+            chunks = [raw[i:i + n] for i in range(0, len(raw), n)]
+            self.assertListEqual(list(_iter_json_array(chunks)), json.loads(raw))
+
+    def test_truncated_array(self):
+        self.assertRaises(ValueError, list, _iter_json_array(['[{"id": 1}, {"id"']))
+
+class TestIterGamesEndpoint(unittest.TestCase):
+    def _mock_response(self, raw):
+        r = Mock()
+        r.__enter__ = Mock(return_value=r)
+        r.__exit__ = Mock(return_value=False)
+        r.iter_content.return_value = [raw[i:i + 4].encode("utf-8") for i in range(0, len(raw), 4)]
+        return r
+
+    @patch("requests.post")
+    def test_games_yielded(self, mock_post):
+        mock_post.return_value = self._mock_response('[{"id": 1, "name": "אחת"}, {"id": 2}]')
+        igdb = IGDB(client_id="", client_secret="", bearer="...")
+        self.assertListEqual(list(igdb.iter_games_endpoint(raw_body="fields *")),
+                             [{"id": 1, "name": "אחת"}, {"id": 2}])
+
+    @patch("requests.post")
+    def test_internal_server_error(self, mock_post):
+        mock_post.return_value = self._mock_response('[{"status": 500}]')
+        igdb = IGDB(client_id="", client_secret="", bearer="...")
+        self.assertRaises(ValueError, list, igdb.iter_games_endpoint(raw_body="fields *"))
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,59 @@
+import pathlib
+import unittest
+import sys
+import os
+import tempfile
+sys.path.append(str(pathlib.Path(__file__).parents[1] / "src"))
+from image_cache import ImageCache
+from unittest.mock import patch
+
+class TestKeyForUrl(unittest.TestCase):
+    def test_igdb_url(self):
+        key = ImageCache.key_for_url("https://images.igdb.com/igdb/image/upload/t_original/co1abc.jpg")
+        self.assertEqual(key, "co1abc.original.jpg")
+
+    def test_other_url(self):
+        self.assertIsNone(ImageCache.key_for_url("https://..."))
+
+class TestFromEnv(unittest.TestCase):
+    def test_configured(self):
+        with patch.dict(os.environ, {"IMAGE_CACHE_DIR": "/tmp/some-cache", "IMAGE_CACHE_MAX_BYTES": "1024"}):
+            cache = ImageCache.from_env()
+        self.assertEqual((str(cache.path), cache.max_bytes), ("/tmp/some-cache", 1024))
+
+    def test_disabled(self):
+        for env in ({"IMAGE_CACHE_MAX_BYTES": "0"}, {"IMAGE_CACHE_MAX_BYTES": ""}, {"IMAGE_CACHE_DIR": ""}):
+            with patch.dict(os.environ, env):
+                self.assertIsNone(ImageCache.from_env())
+
+    def test_malformed_max_bytes(self):
+        with patch.dict(os.environ, {"IMAGE_CACHE_MAX_BYTES": "256MB"}):
+            self.assertRaises(ValueError, ImageCache.from_env)
+
+class TestImageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ImageCache(path=self.tmp_dir.name, max_bytes=10)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_hit_and_miss(self):
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.put("a", b"1234")
+        self.assertEqual(self.cache.get("a"), b"1234")
+        self.assertDictEqual(self.cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_lru_eviction(self):
+        self.cache.put("a", b"1234")
+        self.cache.put("b", b"1234")
+        os.utime(os.path.join(self.tmp_dir.name, "a"), (0, 0))
+        os.utime(os.path.join(self.tmp_dir.name, "b"), (1, 1))
+        self.cache.get("a")   # "b" is now the least recently used
+        self.cache.put("c", b"1234")
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), b"1234")
+        self.assertEqual(self.cache.get("c"), b"1234")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import pathlib
+import unittest
+import sys
+import io
+sys.path.append(str(pathlib.Path(__file__).parents[1] / "src"))
+import images
+from PIL import Image
+
+def _gradient_png(width, height, flip=False):
+    img = Image.new("RGB", (width, height))
+    img.putdata([(((x * 255) // width) if not flip else 255 - ((x * 255) // width), (y * 255) // height, 128)
+                 for y in range(height) for x in range(width)])
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+class TestPrepareImage(unittest.TestCase):
+    def test_not_an_image(self):
+        prepared = images.prepare_image(b"...")
+        self.assertEqual(prepared.content, b"...")
+        self.assertIsNone(prepared.dhash)
+
+    def test_small_image_untouched(self):
+        png = _gradient_png(64, 64)
+        self.assertEqual(images.prepare_image(png).content, png)
+
+    def test_oversized_image_transcoded(self):
+        prepared = images.prepare_image(_gradient_png(images.MAX_IMAGE_DIMENSION + 100, 50))
+        with Image.open(io.BytesIO(prepared.content)) as img:
+            self.assertEqual(img.format, "JPEG")
+            self.assertLessEqual(max(img.size), images.MAX_IMAGE_DIMENSION)
+
+    def test_palette_transparency_flattened_onto_white(self):
+        img = Image.new("P", (8, 8), 0)
+        img.putpalette([0, 0, 0] * 256)
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", transparency=0)
+        with Image.open(io.BytesIO(buf.getvalue())) as transparent:
+            self.assertEqual(transparent.mode, "P")
+            with Image.open(io.BytesIO(images._transcode(transparent))) as transcoded:
+                self.assertEqual(transcoded.mode, "RGB")
+                self.assertGreater(min(transcoded.getpixel((4, 4))), 250)
+
+class TestDropNearDuplicates(unittest.TestCase):
+    def test_near_duplicates_dropped(self):
+        original = images.prepare_image(_gradient_png(200, 100))
+        resized = images.prepare_image(_gradient_png(100, 50))
+        different = images.prepare_image(_gradient_png(200, 100, flip=True))
+        undecodable = images.prepare_image(b"...")
+        kept = images.drop_near_duplicates([original, resized, different, undecodable])
+        self.assertListEqual(kept, [original, different, undecodable])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,6 +9,10 @@ import conn_redis
 import redis
 from unittest.mock import patch, Mock
 from dotenv import load_dotenv
+try:
+    import fakeredis
+except ImportError:     # the redis behaviour tests need fakeredis[lua]
+    fakeredis = None
 
 class TestConnect(unittest.TestCase):
     def test_connection_error(self):
@@ -28,5 +32,201 @@ class TestGetdelSingleGameDataDict(unittest.TestCase):
     def test_bad_redis_client(self):
         self.assertRaises(ConnectionError, conn_redis.getdel_single_game_data_dict, None)
 
+class TestStageRawGameDataDictsBatched(unittest.TestCase):
+    def test_batches(self):
+        rc = Mock()
+        staged = conn_redis.stage_raw_game_data_dicts_batched(
+            redis_client=rc, data_dicts=({"name": str(i)} for i in range(5)), batch_size=2)
+        self.assertEqual(staged, 5)
+        self.assertEqual(rc.pipeline.return_value.execute.call_count, 3)
+
+@unittest.skipUnless(fakeredis, "fakeredis isn't installed")
+class TestSwapStagedGameDataDicts(unittest.TestCase):
+    def test_swapped(self):
+        rc = fakeredis.FakeRedis(decode_responses=True)
+        rc.set("yesterday's game", "{}")
+        conn_redis.stage_raw_game_data_dicts_batched(
+            redis_client=rc, data_dicts=({"name": str(i)} for i in range(5)), batch_size=2)
+        self.assertEqual(rc.get("yesterday's game"), "{}")
+        self.assertEqual(conn_redis.swap_staged_game_data_dicts(redis_client=rc, batch_size=2), 5)
+        self.assertCountEqual(rc.keys(), ["0", "1", "2", "3", "4"])
+        self.assertDictEqual(json.loads(rc.get("3")), {"name": "3"})
+
+    def test_yesterdays_inflight_game_not_requeued(self):
+        rc = fakeredis.FakeRedis(decode_responses=True)
+        rc.set("yesterday's game", "{}")
+        conn_redis.claim_game_data_dict(redis_client=rc, key="yesterday's game", visibility_timeout_secs=-1)
+        conn_redis.store_prefetched_media_ids(redis_client=rc, game_key="other game", media_ids=["1"])
+        conn_redis.stage_raw_game_data_dicts_batched(redis_client=rc, data_dicts=[{"name": "today's game"}])
+        conn_redis.swap_staged_game_data_dicts(redis_client=rc)
+        self.assertEqual(conn_redis.reap_inflight_game_data_dicts(redis_client=rc), (0, 0))
+        self.assertListEqual(rc.keys(), ["today's game"])
+
+class TestGetRandomGameKey(unittest.TestCase):
+    def test_reserved_keys_skipped(self):
+        rc = Mock()
+        rc.randomkey.side_effect = ["crawl:shards", "crawl:rate:100", "media:next", "some game"]
+        self.assertEqual(conn_redis.get_random_game_key(redis_client=rc), "some game")
+
+    def test_only_reserved_keys(self):
+        rc = Mock()
+        rc.randomkey.return_value = "media:next"
+        rc.scan_iter.return_value = ["media:next", "day:filled"]
+        self.assertIsNone(conn_redis.get_random_game_key(redis_client=rc))
+
+    def test_scan_after_missed_samples(self):
+        rc = Mock()
+        rc.randomkey.return_value = "media:next"
+        rc.scan_iter.return_value = ["media:next", "some game", "day:filled"]
+        self.assertEqual(conn_redis.get_random_game_key(redis_client=rc), "some game")
+
+    @unittest.skipUnless(fakeredis, "fakeredis isn't installed")
+    def test_single_game_among_reserved_keys(self):
+        rc = fakeredis.FakeRedis(decode_responses=True)
+        rc.set("some game", "{}")
+        for i in range(7):
+            rc.hset(conn_redis.DAY_QUEUE_KEY_PREFIX + f"2023-03-0{i + 1}", "other game", "{}")
+        rc.sadd(conn_redis.FILLED_DAYS_KEY, "2023-03-01")
+        for key in (conn_redis.INFLIGHT_GAMES_KEY, conn_redis.INFLIGHT_ATTEMPTS_KEY, conn_redis.PREFETCHED_MEDIA_KEY):
+            rc.hset(key, "claimed game", "1")
+        rc.zadd(conn_redis.INFLIGHT_DEADLINES_KEY, {"claimed game": 1})
+        for _ in range(200):
+            self.assertEqual(conn_redis.get_random_game_key(redis_client=rc), "some game")
+        self.assertEqual(conn_redis.peek_single_game_data_dict(redis_client=rc), ("some game", {}))
+        rc.delete("some game")
+        self.assertIsNone(conn_redis.get_random_game_key(redis_client=rc))
+
+class TestPopPrefetchedMediaIds(unittest.TestCase):
+    def test_nothing_prefetched(self):
+        rc = Mock()
+        rc.pipeline.return_value.execute.return_value = [{}, 0]
+        self.assertIsNone(conn_redis.pop_prefetched_media_ids(redis_client=rc))
+
+    def test_prefetched(self):
+        rc = Mock()
+        rc.pipeline.return_value.execute.return_value = [{"game": "some game", "media_ids": '["1", "2"]'}, 1]
+        self.assertEqual(conn_redis.pop_prefetched_media_ids(redis_client=rc), ("some game", ["1", "2"]))
+
+class TestClaimGameDataDict(unittest.TestCase):
+    def test_claimed(self):
+        rc = Mock()
+        rc.eval.return_value = '{"name": "some game"}'
+        self.assertDictEqual(conn_redis.claim_game_data_dict(redis_client=rc, key="some game"), {"name": "some game"})
+
+    def test_already_claimed(self):
+        rc = Mock()
+        rc.eval.return_value = None
+        self.assertIsNone(conn_redis.claim_game_data_dict(redis_client=rc, key="some game"))
+
+    def test_bad_redis_client(self):
+        self.assertRaises(ConnectionError, conn_redis.claim_single_game_data_dict, None)
+
+class TestReapInflightGameDataDicts(unittest.TestCase):
+    def test_counts(self):
+        rc = Mock()
+        rc.zrangebyscore.return_value = ["game 1", "game 2", "game 3"]
+        rc.eval.return_value = [2, 1]
+        self.assertEqual(conn_redis.reap_inflight_game_data_dicts(redis_client=rc), (2, 1))
+        self.assertEqual(rc.eval.call_args.args[1], 6)
+
+    def test_nothing_expired(self):
+        rc = Mock()
+        rc.zrangebyscore.return_value = []
+        self.assertEqual(conn_redis.reap_inflight_game_data_dicts(redis_client=rc), (0, 0))
+        rc.eval.assert_not_called()
+
+@unittest.skipUnless(fakeredis, "fakeredis isn't installed")
+class TestInflightScripts(unittest.TestCase):
+    def setUp(self):
+        self.rc = fakeredis.FakeRedis(decode_responses=True)
+        self.rc.set("some game", json.dumps({"name": "some game"}))
+
+    def _inflight(self):
+        return (self.rc.hkeys(conn_redis.INFLIGHT_GAMES_KEY), self.rc.zrange(conn_redis.INFLIGHT_DEADLINES_KEY, 0, -1))
+
+    def test_claim_and_ack(self):
+        self.assertDictEqual(conn_redis.claim_game_data_dict(redis_client=self.rc, key="some game"),
+                             {"name": "some game"})
+        self.assertIsNone(self.rc.get("some game"))
+        self.assertEqual(self._inflight(), (["some game"], ["some game"]))
+        self.assertEqual(self.rc.hget(conn_redis.INFLIGHT_ATTEMPTS_KEY, "some game"), "1")
+        self.assertIsNone(conn_redis.claim_game_data_dict(redis_client=self.rc, key="some game"))
+        conn_redis.ack_game_data_dict(redis_client=self.rc, key="some game")
+        self.assertEqual(self._inflight(), ([], []))
+        self.assertListEqual(self.rc.keys(), [])
+
+    def test_only_expired_games_reaped(self):
+        self.rc.set("other game", json.dumps({"name": "other game"}))
+        conn_redis.claim_game_data_dict(redis_client=self.rc, key="some game", visibility_timeout_secs=-1)
+        conn_redis.claim_game_data_dict(redis_client=self.rc, key="other game")
+        self.assertEqual(conn_redis.reap_inflight_game_data_dicts(redis_client=self.rc), (1, 0))
+        self.assertDictEqual(json.loads(self.rc.get("some game")), {"name": "some game"})
+        self.assertIsNone(self.rc.get("other game"))
+        self.assertEqual(self._inflight(), (["other game"], ["other game"]))
+
+    def test_requeue_keeps_newer_game(self):
+        conn_redis.claim_game_data_dict(redis_client=self.rc, key="some game", visibility_timeout_secs=-1)
+        self.rc.set("some game", json.dumps({"name": "some game", "year": 2000}))
+        self.assertEqual(conn_redis.reap_inflight_game_data_dicts(redis_client=self.rc), (1, 0))
+        self.assertDictEqual(json.loads(self.rc.get("some game")), {"name": "some game", "year": 2000})
+
+    def test_dropped_after_max_attempts(self):
+        for _ in range(conn_redis.MAX_DELIVERY_ATTEMPTS - 1):
+            conn_redis.claim_game_data_dict(redis_client=self.rc, key="some game", visibility_timeout_secs=-1)
+            self.assertEqual(conn_redis.reap_inflight_game_data_dicts(redis_client=self.rc), (1, 0))
+        conn_redis.claim_game_data_dict(redis_client=self.rc, key="some game", visibility_timeout_secs=-1)
+        self.assertEqual(conn_redis.reap_inflight_game_data_dicts(redis_client=self.rc), (0, 1))
+        self.assertListEqual(self.rc.keys(), [])
+
+class TestCountGameDataDicts(unittest.TestCase):
+    def test_reserved_keys_skipped(self):
+        rc = Mock()
+        rc.scan_iter.return_value = ["some game", "day:filled", "inflight:games", "media:next", "other game"]
+        self.assertEqual(conn_redis.count_game_data_dicts(redis_client=rc), 2)
+
+class TestClearGameDataDicts(unittest.TestCase):
+    def test_reserved_keys_kept(self):
+        rc = Mock()
+        rc.scan_iter.return_value = ["some game", "day:2023-01-01", "day:filled", "crawl:shards", "other game"]
+        self.assertEqual(conn_redis.clear_game_data_dicts(redis_client=rc), 2)
+        deleted = [c.args for c in rc.pipeline.return_value.delete.call_args_list]
+        self.assertIn(("some game",), deleted)
+        self.assertNotIn(("day:2023-01-01",), deleted)
+
+class TestPromoteDayQueue(unittest.TestCase):
+    def test_promoted(self):
+        rc = Mock()
+        rc.hgetall.return_value = {"some game": '{"name": "some game"}'}
+        rc.scan_iter.return_value = []
+        self.assertListEqual(conn_redis.promote_day_queue(redis_client=rc, day="2023-01-01"), ["some game"])
+        rc.pipeline.return_value.set.assert_called_with(name="some game", value='{"name": "some game"}')
+
+class TestClaimCrawlShard(unittest.TestCase):
+    def test_bad_redis_client(self):
+        self.assertRaises(ConnectionError, conn_redis.claim_crawl_shard, None)
+
+class TestGetCrawlProgress(unittest.TestCase):
+    def test_no_crawl(self):
+        rc = Mock()
+        rc.pipeline.return_value.execute.return_value = [None, 0]
+        self.assertEqual(conn_redis.get_crawl_progress(redis_client=rc), (0, 0))
+
+@unittest.skipUnless(fakeredis, "fakeredis isn't installed")
+class TestAcquireRateSlot(unittest.TestCase):
+    @patch("conn_redis.time")
+    def test_waits_for_next_second(self, mock_time):
+        rc = fakeredis.FakeRedis(decode_responses=True)
+        mock_time.time.side_effect = [100.2, 100.3, 100.4, 101.0]
+        for _ in range(3):
+            conn_redis.acquire_rate_slot(redis_client=rc, requests_per_sec=2)
+        mock_time.sleep.assert_called_once()
+        self.assertAlmostEqual(mock_time.sleep.call_args.args[0], 0.6)
+        self.assertEqual(rc.get(conn_redis.CRAWL_RATE_KEY_PREFIX + "100"), "3")
+        self.assertEqual(rc.get(conn_redis.CRAWL_RATE_KEY_PREFIX + "101"), "1")
+        self.assertLessEqual(rc.ttl(conn_redis.CRAWL_RATE_KEY_PREFIX + "101"), 2)
+
+    def test_bad_redis_client(self):
+        self.assertRaises(ConnectionError, conn_redis.acquire_rate_slot, None, 1)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
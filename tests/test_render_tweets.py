@@ -0,0 +1,122 @@
+import unittest
+import json
+import os
+import logging
+import tempfile
+from datetime import date, datetime, timezone
+from run_daily import _prepare_dates_list, _prepare_request_body
+from render_tweets import load_dataset, _candidates_by_day, _render_day
+
+
+def _ts(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+def _raw_dd(name, released, **kwargs):
+    return {"name": name, "first_release_date": released, "total_rating": 90, "total_rating_count": 50,
+            "platforms": [{"name": "Wii"}], **kwargs}
+
+
+class TestLoadDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dds = [_raw_dd("game 1", _ts(2000, 3, 1)), _raw_dd("game 2", _ts(2001, 3, 2))]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, content):
+        path = os.path.join(self.tmp_dir.name, "dataset")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_json_array(self):
+        self.assertListEqual(load_dataset(self._write("\n  " + json.dumps(self.dds, indent=2))), self.dds)
+
+    def test_json_lines(self):
+        self.assertListEqual(load_dataset(self._write("\n".join(json.dumps(dd) for dd in self.dds) + "\n\n")),
+                             self.dds)
+
+    def test_bad_dataset(self):
+        self.assertRaises(ValueError, load_dataset, self._write("[{"))
+        self.assertRaises(ValueError, load_dataset, os.path.join(self.tmp_dir.name, "missing"))
+
+
+class TestCandidatesByDay(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_grouped(self):
+        dds = [_raw_dd("game 1", _ts(2000, 3, 1, 12)), _raw_dd("game 2", _ts(1990, 3, 1), total_rating_count=80),
+               _raw_dd("game 3", _ts(2000, 12, 31, 23)), _raw_dd("too late", _ts(2000, 12, 31, 23, 30)),
+               _raw_dd("too early", _ts(1969, 3, 1)), _raw_dd("old game", _ts(2010, 3, 1), category=8),
+               _raw_dd("too recent", _ts(2021, 3, 1)), {"name": "unreleased"}]
+        by_day = _candidates_by_day(dds, [date(2023, 3, 1), date(2023, 3, 2), date(2023, 12, 31), date(2024, 3, 1)])
+        # ranked by rating count
+        self.assertListEqual([(dd["name"], dd["year"]) for dd in by_day[0]],
+                             [("game 2", 1990), ("game 1", 2000), ("old game Remake", 2010)])
+        self.assertListEqual(by_day[1], [])
+        self.assertListEqual([dd["name"] for dd in by_day[2]], ["game 3"])
+        self.assertListEqual([dd["name"] for dd in by_day[3]], ["game 2", "game 1", "old game Remake", "too recent"])
+        self.assertNotIn("year", dds[0])
+
+
+class TestRenderDay(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_rendered(self):
+        candidates = [
+            _raw_dd("game", _ts(2000, 3, 1, 10)),
+            _raw_dd("broken game", _ts(2001, 3, 1), involved_companies=[{"company": {"name": "some dev"}}]),
+            _raw_dd("late game", _ts(2002, 3, 1, 23, 30)),
+            _raw_dd("recent game", _ts(2021, 3, 1)),
+            _raw_dd("poorly rated game", _ts(2003, 3, 1), total_rating=10, total_rating_count=20),
+            _raw_dd("dlc", _ts(2004, 3, 1), id=2, parent_game=1)]
+        rendered = _render_day(date(2023, 3, 1), _candidates_by_day(candidates, [date(2023, 3, 1)])[0])
+        self.assertListEqual([(r["name"], r["year"]) for r in rendered], [("game", 2000), ("broken game", 2001)])
+        self.assertEqual(rendered[0]["date"], "2023-03-01")
+        self.assertIn("2000", rendered[0]["tweet"])
+        self.assertIn("23", rendered[0]["tweet"].splitlines()[0])
+        self.assertNotIn("error", rendered[0])
+        self.assertIn("Could not clean GameInfo data dict", rendered[1]["error"])
+        self.assertNotIn("tweet", rendered[1])
+
+    def test_feb_29(self):
+        candidates = [_raw_dd("leap game", _ts(2000, 2, 29)), _raw_dd("other leap game", _ts(2001, 2, 28))]
+        by_day = _candidates_by_day(candidates, [date(2024, 2, 28), date(2024, 2, 29)])
+        self.assertListEqual([r["name"] for r in _render_day(date(2024, 2, 29), by_day[1])], ["leap game"])
+        self.assertListEqual([r["name"] for r in _render_day(date(2024, 2, 28), by_day[0])], ["other leap game"])
+
+
+class TestPrepareDatesList(unittest.TestCase):
+    def test_feb_29(self):
+        dates = _prepare_dates_list(on=datetime(2024, 2, 29, tzinfo=timezone.utc))
+        self.assertListEqual([d.lower_bound["dt"].year for d in dates], list(range(1972, 2022, 4)))
+        self.assertTrue(all((d.lower_bound["dt"].month, d.lower_bound["dt"].day) == (2, 29) for d in dates))
+
+    def test_years(self):
+        dates = _prepare_dates_list(on=datetime(2023, 3, 1, tzinfo=timezone.utc))
+        self.assertListEqual([d.lower_bound["dt"].year for d in dates], list(range(1970, 2021)))
+
+
+class TestPrepareRequestBody(unittest.TestCase):
+    def test_first_release_date(self):
+        d = _prepare_dates_list(on=datetime(2023, 3, 1, tzinfo=timezone.utc))[0]
+        body = _prepare_request_body(d, limit=500)
+        fields = [f.strip() for f in body[len("fields "):body.index(";")].split(",")]
+        self.assertIn("first_release_date", fields)
+        self.assertIn(f"first_release_date >= {d.lower_bound['ts']}", body)
+        self.assertTrue(body.endswith("limit 500;"))
+        self.assertNotIn("limit", _prepare_request_body(d))
+
+
+if __name__ == "__main__":
+    unittest.main()
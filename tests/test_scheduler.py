@@ -0,0 +1,38 @@
+import pathlib
+import unittest
+import sys
+from datetime import datetime, timezone
+sys.path.append(str(pathlib.Path(__file__).parents[1] / "src"))
+from scheduler import CronTrigger, JobMetrics
+
+class TestCronTrigger(unittest.TestCase):
+    def test_unsupported_expression(self):
+        self.assertRaises(ValueError, CronTrigger, "0 5 1 * *")
+        self.assertRaises(ValueError, CronTrigger, "61 5")
+
+    def test_daily(self):
+        t = CronTrigger("0 5 * * *")
+        self.assertEqual(t.next_fire(datetime(2023, 1, 1, 4, 59, tzinfo=timezone.utc)),
+                         datetime(2023, 1, 1, 5, 0, tzinfo=timezone.utc))
+        self.assertEqual(t.next_fire(datetime(2023, 1, 1, 5, 0, tzinfo=timezone.utc)),
+                         datetime(2023, 1, 2, 5, 0, tzinfo=timezone.utc))
+
+    def test_every_two_hours(self):
+        t = CronTrigger("30 */2")
+        self.assertEqual(t.next_fire(datetime(2023, 1, 1, 23, 45, tzinfo=timezone.utc)),
+                         datetime(2023, 1, 2, 0, 30, tzinfo=timezone.utc))
+        self.assertEqual(t.next_fire(datetime(2023, 1, 1, 1, 10, tzinfo=timezone.utc)),
+                         datetime(2023, 1, 1, 2, 30, tzinfo=timezone.utc))
+
+class TestJobMetrics(unittest.TestCase):
+    def test_counters(self):
+        m = JobMetrics("some_job")
+        m.start()
+        m.finish(early_exit=True)
+        m.start()
+        m.finish(error=True)
+        self.assertEqual((m.runs, m.early_exits, m.errors, m.running), (2, 1, 1, False))
+        assert 'bot_job_runs_total{job="some_job"} 2.0' in m.as_prometheus()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import json
+import logging
+from datetime import datetime, timezone
+from unittest.mock import Mock
+import src.conn_redis as conn_redis
+from run_daily import _prepare_dates_list
+from run_sharded_daily import run_crawl_coordinator, run_crawl_worker, run_crawl_finalizer,\
+    _split_dates_to_shards, _shard_to_dates
+try:
+    import fakeredis
+except ImportError:     # the redis behaviour tests need fakeredis[lua]
+    fakeredis = None
+
+ON: datetime = datetime(2023, 3, 1, tzinfo=timezone.utc)
+
+
+class TestSplitDatesToShards(unittest.TestCase):
+    def test_round_trip(self):
+        dates = _prepare_dates_list(on=ON)
+        shards = _split_dates_to_shards(dates=dates, num_shards=4)
+        self.assertEqual(len(shards), 4)
+        round_tripped = [d for s in shards for d in _shard_to_dates(json.dumps(s))]
+        self.assertCountEqual([(d.lower_bound["dt"], d.upper_bound["dt"]) for d in round_tripped],
+                              [(d.lower_bound["dt"], d.upper_bound["dt"]) for d in dates])
+        self.assertCountEqual([(d.lower_bound["ts"], d.upper_bound["ts"]) for d in round_tripped],
+                              [(d.lower_bound["ts"], d.upper_bound["ts"]) for d in dates])
+
+    def test_more_shards_than_dates(self):
+        dates = _prepare_dates_list(on=ON)[:3]
+        self.assertEqual(len(_split_dates_to_shards(dates=dates, num_shards=8)), 3)
+
+    def test_bad_shard(self):
+        self.assertRaises(ValueError, _shard_to_dates, "not a shard")
+
+
+@unittest.skipUnless(fakeredis, "fakeredis isn't installed")
+class TestShardedCrawl(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.rc = fakeredis.FakeRedis(decode_responses=True)
+        dates = _prepare_dates_list(on=ON)[:4]
+        self.shards = _split_dates_to_shards(dates=dates, num_shards=2)
+        self.igdb_client = Mock()
+        self.igdb_client.get_games_endpoint.side_effect = lambda raw_body: [
+            {"name": "game {}".format(self.igdb_client.get_games_endpoint.call_count)},
+            {"name": "dlc", "id": 2, "parent_game": 1}]
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_coordinator(self):
+        self.igdb_client.auth_header = "Bearer token"
+        run_crawl_coordinator(num_shards=3, igdb_client=self.igdb_client, redis_client=self.rc)
+        self.assertEqual(self.rc.llen(conn_redis.CRAWL_SHARDS_KEY), 3)
+        self.assertEqual(conn_redis.get_crawl_bearer(redis_client=self.rc), "token")
+        self.assertEqual(conn_redis.get_crawl_progress(redis_client=self.rc), (3, 0))
+
+    def test_worker(self):
+        conn_redis.push_crawl_shards(redis_client=self.rc, shards=self.shards, bearer="token")
+        run_crawl_worker(requests_per_sec=1000, igdb_client=self.igdb_client, redis_client=self.rc)
+        self.assertEqual(self.igdb_client.get_games_endpoint.call_count, 4)
+        self.assertEqual(conn_redis.get_crawl_progress(redis_client=self.rc), (2, 2))
+        self.assertCountEqual([dd["name"] for dd in conn_redis.get_crawl_results(redis_client=self.rc)],
+                              ["game 1", "game 2", "game 3", "game 4"])
+        self.assertEqual(self.rc.zcard(conn_redis.CRAWL_CLAIMED_KEY), 0)
+
+    def test_worker_without_crawl(self):
+        self.assertRaises(SystemExit, run_crawl_worker, 1000, self.igdb_client, self.rc)
+        self.igdb_client.get_games_endpoint.assert_not_called()
+
+    def test_shard_completed_twice(self):
+        conn_redis.push_crawl_shards(redis_client=self.rc, shards=self.shards, bearer="token")
+        raw_shard = conn_redis.claim_crawl_shard(redis_client=self.rc, claim_timeout_secs=-1)
+        self.assertEqual(conn_redis.requeue_expired_crawl_shards(redis_client=self.rc), 1)
+        self.assertTrue(conn_redis.complete_crawl_shard(
+            redis_client=self.rc, raw_shard=raw_shard, data_dicts=[{"name": "some game"}]))
+        self.assertFalse(conn_redis.complete_crawl_shard(
+            redis_client=self.rc, raw_shard=raw_shard, data_dicts=[{"name": "some game"}]))
+        self.assertEqual(conn_redis.get_crawl_progress(redis_client=self.rc), (2, 1))
+        self.assertEqual(len(conn_redis.get_crawl_results(redis_client=self.rc)), 1)
+        # the requeued copy was removed from the work queue once the shard was done
+        self.assertEqual(self.rc.llen(conn_redis.CRAWL_SHARDS_KEY), 1)
+
+    def test_only_expired_claims_requeued(self):
+        conn_redis.push_crawl_shards(redis_client=self.rc, shards=self.shards, bearer="token")
+        running = conn_redis.claim_crawl_shard(redis_client=self.rc)
+        expired = conn_redis.claim_crawl_shard(redis_client=self.rc, claim_timeout_secs=-1)
+        self.assertEqual(conn_redis.requeue_expired_crawl_shards(redis_client=self.rc), 1)
+        self.assertListEqual(self.rc.lrange(conn_redis.CRAWL_SHARDS_KEY, 0, -1), [expired])
+        self.assertListEqual(self.rc.zrange(conn_redis.CRAWL_CLAIMED_KEY, 0, -1), [running])
+
+    def test_finalizer_requeues_expired_shards(self):
+        conn_redis.push_crawl_shards(redis_client=self.rc, shards=self.shards, bearer="token")
+        self.rc.set("some game", json.dumps({"name": "some game"}))
+        running = conn_redis.claim_crawl_shard(redis_client=self.rc)
+        expired = conn_redis.claim_crawl_shard(redis_client=self.rc, claim_timeout_secs=-1)
+        self.assertRaises(SystemExit, run_crawl_finalizer, self.rc)
+        self.assertListEqual(self.rc.lrange(conn_redis.CRAWL_SHARDS_KEY, 0, -1), [expired])
+        self.assertListEqual(self.rc.zrange(conn_redis.CRAWL_CLAIMED_KEY, 0, -1), [running])
+        self.assertIsNotNone(self.rc.get("some game"))
+
+    def test_finalizer_stores_results(self):
+        conn_redis.push_crawl_shards(redis_client=self.rc, shards=self.shards, bearer="token")
+        self.rc.set("yesterday's game", json.dumps({"name": "yesterday's game"}))
+        self.rc.hset(conn_redis.DAY_QUEUE_KEY_PREFIX + "2023-03-02", "tomorrow's game", "{}")
+        run_crawl_worker(requests_per_sec=1000, igdb_client=self.igdb_client, redis_client=self.rc)
+        run_crawl_finalizer(redis_client=self.rc)
+        games = [k for k in self.rc.keys() if not k.startswith(conn_redis.RESERVED_KEY_PREFIXES)]
+        self.assertCountEqual(games, ["game 1", "game 2", "game 3", "game 4"])
+        self.assertEqual(json.loads(self.rc.get("game 1"))["name"], "game 1")
+        # the crawl's own keys are removed, the bot's other keys are kept
+        self.assertFalse(self.rc.exists(conn_redis.CRAWL_SHARDS_KEY, conn_redis.CRAWL_TOTAL_KEY,
+                                        conn_redis.CRAWL_DONE_KEY, conn_redis.CRAWL_RESULTS_KEY,
+                                        conn_redis.CRAWL_BEARER_KEY))
+        self.assertEqual(self.rc.hget(conn_redis.DAY_QUEUE_KEY_PREFIX + "2023-03-02", "tomorrow's game"), "{}")
+
+    def test_finalizer_without_crawl(self):
+        self.assertRaises(SystemExit, run_crawl_finalizer, self.rc)
+
+
+if __name__ == "__main__":
+    unittest.main()